@@ -0,0 +1,88 @@
+"""Headless entry point: ``python -m controller`` runs ControllerBot without pygame."""
+import time
+
+STARTED = time.perf_counter()
+
+import asyncio
+import os
+import signal
+import sys
+from dotenv import load_dotenv
+from controller.bot import ControllerBot
+from controller.diagnostics import startup_report
+from controller.log_pipeline import log_pipeline, LEVELS
+from controller.settings_store import settings_store
+
+
+def print_record(record):
+    """Print pipeline records at or above BOT_LOG_LEVEL (default: info) to stdout."""
+    if LEVELS.get(record["level"], 20) >= LEVELS.get(os.getenv("BOT_LOG_LEVEL", "info"), 20):
+        print(f"[{record['level'].upper()}] {record['message']}", flush=True)
+
+
+def install_signal_handlers(loop, stop):
+    """Set `stop` on SIGINT/SIGTERM."""
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops do not support add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+
+async def run():
+    """Build ControllerBot from .env and settings.json and run it until a signal arrives."""
+    log_pipeline.subscribe(print_record)
+    log_pipeline.start()
+    load_dotenv()
+    token = os.getenv("DISCORD_TOKEN", "")
+    if not token:
+        log_pipeline.emit("⚠️ No DISCORD_TOKEN found in .env", level="error", controller="headless")
+        return 1
+
+    bot = ControllerBot(token)
+    bot.log_message(f"Loaded controllers: {bot.controllers}", controller="headless")
+    bot.log_message(startup_report("Headless", STARTED), controller="headless")
+    if "pygame" in sys.modules:
+        bot.log_message("pygame was imported by a controller in headless mode", level="warning", controller="headless")
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    install_signal_handlers(loop, stop)
+
+    bot_task = asyncio.create_task(bot.start(token))
+    stop_task = asyncio.create_task(stop.wait())
+    await asyncio.wait({bot_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+
+    exit_code = 0
+    if stop_task.done():
+        bot.log_message("Shutting down...", controller="headless")
+        # Cancel instead of awaiting: after close() py-cord's reconnect loop fails on the closed session
+        bot_task.cancel()
+        await asyncio.gather(bot_task, return_exceptions=True)
+    else:
+        stop_task.cancel()
+        try:
+            await bot_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            bot.log_message(f"Bot stopped with error: {str(e)}", level="error", controller="headless")
+            exit_code = 1
+    if not bot.is_closed():
+        await bot.close()
+    bot.log_message("Bot stopped.", controller="headless")
+    return exit_code
+
+
+def main():
+    try:
+        exit_code = asyncio.run(run())
+    finally:
+        settings_store.flush()
+        log_pipeline.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""Point py-cord's REST client at another API base (DISCORD_API_BASE, the fake_discord stand-in)."""
+import discord.http
+
+
+def use_api_base(base_url):
+    """Send REST calls to `base_url` (e.g. http://127.0.0.1:8765/api/v10) instead of Discord."""
+    if hasattr(discord.http.Route, "API_BASE_URL"):
+        discord.http.Route.API_BASE_URL = base_url
+    else:
+        discord.http.Route.base = property(lambda self: base_url)
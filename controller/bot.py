@@ -1,29 +1,87 @@
 import asyncio
+import math
+import os
+import time
 import discord
 from discord.ext import commands
-from controller.controllers import load_controllers
-import json
-import os
+from controller.api_base import use_api_base
+from controller.controllers import load_controllers, refresh_commands
+from controller.hot_reload import ControllerReloader
+from controller.settings_store import settings_store
+from controller.settings_bus import settings_bus
+from controller.log_pipeline import log_pipeline
+from controller.metrics import MetricsRegistry
+from controller.profiling import CommandProfiler
+from controller.replies import BufferedContext
+from controller.scheduler import ExpiryScheduler
+from controller.schema import Setting, schema_defaults, validate_settings
+
+
+def parse_guild_prefixes(text, log_message=None):
+    """Parse "guild_id=prefix, guild_id=prefix" into {guild_id: prefix}; bad entries are skipped."""
+    prefixes = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        guild_id, sep, prefix = item.partition("=")
+        prefix = prefix.strip()
+        if not sep or not guild_id.strip().isdigit() or not prefix:
+            if log_message:
+                log_message(f"Ignoring guild prefix entry {item!r}: expected guild_id=prefix", level="warning")
+            continue
+        prefixes[int(guild_id)] = prefix
+    return prefixes
 
 
 class ControllerBot(commands.Bot):
     """Main bot class that initializes the bot and loads controllers."""
-    def __init__(self, token, log_message, register_commands=True, load_settings_flag=True):
+    SETTINGS = {
+        "default_prefix": Setting(str, "!", label="Default prefix"),
+        "guild_prefixes": Setting(str, "", label="Guild prefixes (guild_id=prefix, ...)"),
+        "hot_reload": Setting(bool, False, label="Hot reload controllers"),
+        "shard_count": Setting(int, 0, min=0, max=256, label="Shards (0 = single process)"),
+        "shards_per_process": Setting(int, 1, min=1, max=16, label="Shards per worker process"),
+    }
+
+    def __init__(self, token, log_message=None, register_commands=True, load_settings_flag=True, **options):
         intents = discord.Intents.default()
         intents.message_content = True
 
-        self.settings = {
-            "default_prefix": "!"
-        }
+        api_base = os.environ.get("DISCORD_API_BASE")
+        if api_base:
+            # e.g. the local stand-in from `python -m controller.fake_discord --serve`
+            use_api_base(api_base)
+
+        self.settings = self.get_default_settings()
 
         super().__init__(
-            command_prefix=lambda bot, msg: bot.settings.get("default_prefix", "!"),
-            intents=intents
+            command_prefix=lambda bot, msg: bot.resolve_prefix(msg),
+            intents=intents,
+            **options  # e.g. shard_id/shard_count when run by the shard supervisor
         )
 
         self.token = token
-        self.log_message = log_message
+        self._log_sink = log_message  # optional extra plain-text sink
+        log_pipeline.set_secret("token", token)
         self._controllers = []  
+        self._controller_index = {}  # controller name -> instance, kept in sync by load/unload
+        self._controller_sources = {}  # controller name -> source file
+        self._controller_commands = {}  # controller name -> command names it registered
+        self._command_owners = {}  # command name -> controller name
+        self._controller_listeners = {}  # controller name -> [(event, listener)]
+        self._controller_subscriptions = {}  # controller name -> settings bus callback
+        self._reloader = None
+        self._default_prefix = "!"
+        self._prefix_map = {}  # guild id -> prefix, rebuilt when the prefix settings change
+        self._prefix_starts = frozenset("!")  # first characters of every configured prefix
+        self.loop_lag_ms = 0.0  # latest event loop lag sample
+        self.event_count = 0  # gateway events dispatched, for events/sec
+        self.metrics = MetricsRegistry()
+        self.profiler = CommandProfiler()
+        # Timers are stored per guild; a shard loads only the guilds it serves
+        self.scheduler = ExpiryScheduler(shard_id=options.get("shard_id"), shard_count=options.get("shard_count"))
+        self._scheduler_task = None
         self._should_register_commands = register_commands
 
         load_controllers(self)
@@ -31,6 +89,9 @@ class ControllerBot(commands.Bot):
 
         if load_settings_flag:
             self.load_settings()
+        else:
+            self._rebuild_prefixes()
+        settings_bus.subscribe("ControllerBot", self.on_settings_changed)
 
 
     async def setup_hook(self):
@@ -39,36 +100,223 @@ class ControllerBot(commands.Bot):
             rc = self.register_commands()
             if asyncio.iscoroutine(rc):
                 await rc
+        self._start_background_tasks()
+
+    def _start_background_tasks(self):
+        """Start long-running helper tasks once per bot instance."""
+        if self._reloader is None:
+            self._reloader = ControllerReloader(self)
+            asyncio.create_task(self._reloader.run())
+            asyncio.create_task(self._probe_loop_lag())
+            asyncio.create_task(self._sample_metrics())
+            self._scheduler_task = asyncio.create_task(self._run_scheduler())
+
+    async def _run_scheduler(self):
+        """Fire expiry timers once the guild cache is ready."""
+        await self.wait_until_ready()
+        try:
+            await self.scheduler.run()
+        except Exception as e:
+            self.log_message(f"Timer scheduler stopped: {str(e)}", level="error")
+
+    async def _sample_metrics(self, interval=1.0):
+        """Once per interval, record heartbeat latency, loop lag, events/sec and commands/sec."""
+        events_seen = self.event_count
+        while not self.is_closed():
+            await asyncio.sleep(interval)
+            if math.isfinite(self.latency):
+                self.metrics.add_sample("heartbeat_ms", self.latency * 1000)
+            self.metrics.add_sample("loop_lag_ms", self.loop_lag_ms)
+            self.metrics.add_sample("events_per_sec", (self.event_count - events_seen) / interval)
+            events_seen = self.event_count
+            self.metrics.tick(interval)
+
+    async def _probe_loop_lag(self, interval=0.5, report_every=60):
+        """Sample how late the event loop wakes up and periodically log it next to the heartbeat latency."""
+        samples = []
+        while not self.is_closed():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+            samples.append(self.loop_lag_ms)
+            if len(samples) >= report_every:
+                heartbeat_ms = self.latency * 1000 if math.isfinite(self.latency) else None
+                heartbeat_text = f"{heartbeat_ms:.0f} ms" if heartbeat_ms is not None else "n/a"
+                self.log_message(
+                    f"Event loop lag avg {sum(samples) / len(samples):.1f} ms, max {max(samples):.1f} ms; heartbeat {heartbeat_text}",
+                    level="debug", latency_ms=round(max(samples), 2),
+                    heartbeat_ms=round(heartbeat_ms, 2) if heartbeat_ms is not None else None,
+                )
+                samples.clear()
+
+    async def close(self):
+        """Flush pending settings writes before disconnecting."""
+        settings_bus.unsubscribe("ControllerBot", self.on_settings_changed)
+        for name, callback in list(self._controller_subscriptions.items()):
+            settings_bus.unsubscribe(name, callback)
+        self._controller_subscriptions.clear()
+        if self._scheduler_task is not None:
+            # Stop firing timers before the HTTP session closes; unfinished batches stay on disk
+            self._scheduler_task.cancel()
+            await asyncio.gather(self._scheduler_task, return_exceptions=True)
+            self._scheduler_task = None
+        try:
+            await asyncio.to_thread(settings_store.flush)
+            await asyncio.to_thread(self.scheduler.flush)
+        except Exception as e:
+            self.log_message(f"Error saving bot settings: {str(e)}", level="error")
+        await super().close()
 
     async def on_ready(self):
         """Event called when the bot is ready."""
+        self._start_background_tasks()
         self.log_message(f"✅ Bot started as {self.user}")
 
-    @staticmethod
-    def get_default_settings():
+    def log_message(self, message, level="info", **fields):
+        """Emit a structured record (level, controller, guild, command, latency_ms) to the log pipeline."""
+        fields.setdefault("controller", "ControllerBot")
+        record = log_pipeline.emit(message, level=level, **fields)
+        if self._log_sink is not None:
+            self._log_sink(record["message"])
+        return record
+
+    def dispatch(self, event_name, *args, **kwargs):
+        """Count every gateway event before handing it to py-cord."""
+        self.event_count += 1
+        super().dispatch(event_name, *args, **kwargs)
+
+    def get_controller(self, name):
+        """Return the loaded controller instance with the given class name, or None."""
+        return self._controller_index.get(name)
+
+    def refresh_commands(self, name):
+        """Re-register the commands of one controller after its settings changed."""
+        refresh_commands(self, name)
+
+    def get_command_owner(self, command_name):
+        """Return the name of the controller that registered a command, if any."""
+        return self._command_owners.get(command_name)
+
+    async def get_context(self, message, *, cls=BufferedContext):
+        """Build command contexts that can buffer replies (see BufferedContext)."""
+        return await super().get_context(message, cls=cls)
+
+    async def invoke(self, ctx):
+        """Run a command under the profiler so every controller's commands are timed the same way.
+
+        The metrics panel and the debug log take their latency from the same measurement:
+        py-cord dispatches on_command and on_command_completion as separate tasks, which
+        may run before or after the handler, so their clock is not usable for timing.
+        """
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        owner = self.get_command_owner(ctx.command.name) or "ControllerBot"
+        buffered = isinstance(ctx, BufferedContext) and getattr(self.get_controller(owner), "BUFFER_REPLIES", False)
+        ctx.buffering = buffered
+        ctx.started_at = time.perf_counter()
+        with self.profiler.measure(owner, ctx.command.qualified_name) as timing:
+            try:
+                await super().invoke(ctx)
+            finally:
+                if buffered:
+                    # Also after a failure: replies queued before it still go out
+                    ctx.buffering = False
+                    try:
+                        await ctx.flush()
+                    except Exception as e:
+                        self.log_message(
+                            f"Failed to send buffered replies: {str(e)}", level="error", **self._command_fields(ctx)
+                        )
+        if not ctx.command_failed:
+            self._record_completion(ctx, round(timing["ms"], 2))
+
+    def export_stats(self, directory="logs"):
+        """Write per-controller command stats (and captured profiles) to `directory`."""
+        try:
+            path = self.profiler.export(directory)
+            self.log_message(f"📊 Command stats exported to {path}")
+            return path
+        except Exception as e:
+            self.log_message(f"Error exporting command stats: {str(e)}", level="error")
+            return None
+
+    def _command_fields(self, ctx):
+        command_name = ctx.command.qualified_name if ctx.command else None
+        return {
+            "controller": self.get_command_owner(ctx.command.name) if ctx.command else None,
+            "command": command_name,
+            "guild": ctx.guild.id if ctx.guild else None,
+            "channel": ctx.channel.id if ctx.channel else None,
+            "user": ctx.author.id if ctx.author else None,
+        }
+
+    def _record_completion(self, ctx, latency_ms):
+        """Log one debug record per completed command with its handler latency."""
+        self.metrics.record_command(ctx.command.qualified_name, latency_ms)
+        self.log_message(
+            f"{ctx.prefix}{ctx.invoked_with} completed", level="debug",
+            latency_ms=latency_ms, **self._command_fields(ctx)
+        )
+
+    async def on_command_error(self, ctx, error):
+        """Log command failures instead of printing tracebacks to stderr."""
+        if not isinstance(error, commands.CommandNotFound):
+            self.metrics.record_error(ctx.command.qualified_name if ctx.command else None)
+            if ctx.command:
+                owner = self.get_command_owner(ctx.command.name) or "ControllerBot"
+                self.profiler.record_error(owner, ctx.command.qualified_name, getattr(error, "original", error))
+        if ctx.command and ctx.command.has_error_handler():
+            return
+        started = getattr(ctx, "started_at", None)
+        latency_ms = round((time.perf_counter() - started) * 1000, 2) if started else None
+        level = "debug" if isinstance(error, commands.CommandNotFound) else "error"
+        self.log_message(
+            f"{ctx.prefix}{ctx.invoked_with} failed: {error}", level=level,
+            latency_ms=latency_ms, error=type(error).__name__, **self._command_fields(ctx)
+        )
+
+    @classmethod
+    def get_default_settings(cls):
         """Return default settings for the bot."""
-        return {"default_prefix": "!"}
+        return schema_defaults(cls.SETTINGS)
     
+    def on_settings_changed(self, diff):
+        """Apply a settings diff published on the settings bus (e.g. a new default_prefix)."""
+        self.settings.update(diff)
+        if "default_prefix" in diff or "guild_prefixes" in diff:
+            self._rebuild_prefixes()
+
+    def _rebuild_prefixes(self):
+        """Parse the prefix settings into the lookup tables used for every message."""
+        self._default_prefix = self.settings.get("default_prefix") or "!"
+        self._prefix_map = parse_guild_prefixes(self.settings.get("guild_prefixes", ""), self.log_message)
+        self._prefix_starts = frozenset(p[0] for p in [self._default_prefix, *self._prefix_map.values()])
+
+    def resolve_prefix(self, message):
+        """Return the prefix for a message's guild, falling back to default_prefix."""
+        if not self._prefix_map or message.guild is None:
+            return self._default_prefix
+        return self._prefix_map.get(message.guild.id, self._default_prefix)
+
+    async def process_commands(self, message):
+        """Skip messages that cannot start with any configured prefix before building a context."""
+        content = message.content
+        if not content or content[0] not in self._prefix_starts or message.author.bot:
+            return
+        await super().process_commands(message)
+
     def load_settings(self):
-        """Load settings from a JSON file."""    
+        """Load settings from the shared settings store."""
         try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.settings.update(data.get("ControllerBot", {}))
+            stored = settings_store.get("ControllerBot")
+            self.settings.update(validate_settings(self.SETTINGS, stored, self.log_message))
         except Exception as e:
-            self.log_message(f"Error loading bot settings: {str(e)}")
+            self.log_message(f"Error loading bot settings: {str(e)}", level="error")
+        self._rebuild_prefixes()
 
     def save_settings(self):
-        """Save the current settings to a JSON file."""
+        """Queue the current settings for a debounced write to settings.json."""
         try:
-            data = {}
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            data["ControllerBot"] = self.settings
-            with open("settings.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            self.log_message("Bot settings saved")
+            settings_store.set("ControllerBot", self.settings)
         except Exception as e:
-            self.log_message(f"Error saving bot settings: {str(e)}")
+            self.log_message(f"Error saving bot settings: {str(e)}", level="error")
@@ -0,0 +1,239 @@
+"""Bounded-concurrency executor for bulk guild operations (permission fan-out, mass moderation)."""
+import asyncio
+import os
+import time
+import weakref
+import discord
+from controller.settings_store import SettingsStore
+
+
+
+class BulkJobs:
+    """Resume state of bulk runs, one SettingsStore per guild in `directory/<guild id>.json`.
+
+    Only the shard that owns a guild runs its commands, so each file has a single writer
+    even when shards live in different processes.
+    """
+    def __init__(self, directory="bulk_jobs"):
+        self.directory = directory
+        self._stores = {}  # guild id (or None) -> SettingsStore
+
+    def _store(self, guild_id):
+        store = self._stores.get(guild_id)
+        if store is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = "global" if guild_id is None else str(guild_id)
+            store = self._stores[guild_id] = SettingsStore(os.path.join(self.directory, f"{name}.json"))
+        return store
+
+    def get(self, guild_id, job):
+        return self._store(guild_id).get(job)
+
+    def update(self, guild_id, job, values):
+        self._store(guild_id).update(job, values)
+
+    def delete(self, guild_id, job):
+        """Forget a finished job; a guild without jobs loses its file."""
+        store = self._store(guild_id)
+        store.delete(job)
+        if not store.get_all():
+            store.flush()
+            if store.exists():
+                os.remove(store.path)
+
+
+# Pending bulk jobs survive restarts so an interrupted run can pick up where it stopped
+bulk_jobs = BulkJobs()
+
+
+class RateLimiter:
+    """Token bucket for outgoing requests (Discord's global limit is 50 requests/s per token)."""
+    def __init__(self, rate=40.0, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_limiters = weakref.WeakKeyDictionary()  # event loop -> RateLimiter
+
+
+def shared_limiter():
+    """Return the RateLimiter shared by every executor on the running loop.
+
+    A loop runs the bots of one token (one bot, or a worker's shards), and Discord's global
+    limit is per token, so overlapping bulk runs must draw from the same bucket.
+    """
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = _limiters[loop] = RateLimiter()
+    return limiter
+
+
+class BulkResult:
+    """Outcome of a bulk run: item keys that succeeded, were skipped (already done) or failed."""
+    def __init__(self, total):
+        self.total = total
+        self.done = []
+        self.skipped = []
+        self.failed = {}  # key -> error text
+
+    @property
+    def finished(self):
+        return len(self.done) + len(self.skipped) + len(self.failed)
+
+    def summary(self):
+        text = f"{len(self.done) + len(self.skipped)}/{self.total} done"
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        return text
+
+
+def is_retryable(error):
+    """Server errors, rate limits and network hiccups are retried; permission errors are not."""
+    if isinstance(error, (discord.Forbidden, discord.NotFound)):
+        return False
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, OSError))
+
+
+class BulkExecutor:
+    """Run one coroutine per item with bounded concurrency, per-bucket serialisation and retries.
+
+    `bucket(item)` maps an item to its Discord rate-limit bucket (e.g. the channel id of a
+    permission overwrite); items sharing a bucket run one at a time while different buckets
+    run in parallel, and the token bucket every executor on the loop shares (see
+    shared_limiter) keeps the total under the global limit, however many runs overlap.
+    py-cord's HTTP client still honours the actual 429 responses on top of this.
+    """
+    def __init__(self, concurrency=8, limiter=None, retries=3, backoff=1.0, progress=None, progress_interval=2.0):
+        self.concurrency = concurrency
+        self.limiter = limiter  # None: shared_limiter() of the loop the run happens on
+        self.retries = retries
+        self.backoff = backoff
+        self.progress = progress  # async callback(result), called at most every progress_interval seconds
+        self.progress_interval = progress_interval
+
+    async def run(self, items, operation, key=str, bucket=None, job=None, guild=None):
+        """Apply `operation(item)` to every item; `job` names a resumable run stored in bulk_jobs under `guild`."""
+        items = list(items)
+        limiter = self.limiter or shared_limiter()
+        result = BulkResult(len(items))
+        completed = set(bulk_jobs.get(guild, job).get("done", [])) if job else set()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket_locks = {}
+        last_report = [0.0]
+
+        async def report(final=False):
+            now = time.monotonic()
+            if not final and now - last_report[0] < self.progress_interval:
+                return
+            last_report[0] = now
+            if job and not final:
+                bulk_jobs.update(guild, job, {"done": sorted(completed, key=str)})
+            if self.progress:
+                try:
+                    await self.progress(result)
+                except Exception:
+                    pass  # progress is best effort; the bulk run continues
+
+        async def attempt(item):
+            for retry in range(self.retries + 1):
+                await limiter.acquire()
+                try:
+                    await operation(item)
+                    return None
+                except Exception as e:
+                    if retry == self.retries or not is_retryable(e):
+                        return e
+                    await asyncio.sleep(self.backoff * 2 ** retry)
+
+        async def worker(item):
+            item_key = key(item)
+            if item_key in completed:
+                result.skipped.append(item_key)
+                return
+            async with semaphore:
+                if bucket is not None:
+                    lock = bucket_locks.setdefault(bucket(item), asyncio.Lock())
+                    async with lock:
+                        error = await attempt(item)
+                else:
+                    error = await attempt(item)
+            if error is None:
+                result.done.append(item_key)
+                if job:
+                    completed.add(item_key)
+            else:
+                result.failed[item_key] = f"{type(error).__name__}: {error}"
+            await report()
+
+        if job:
+            bulk_jobs.update(guild, job, {"done": sorted(completed, key=str)})
+        try:
+            await asyncio.gather(*(worker(item) for item in items))
+        finally:
+            if job:
+                # Keep the job while anything failed so re-running it retries only the failures
+                if result.failed or result.finished < result.total:
+                    bulk_jobs.update(guild, job, {"done": sorted(completed, key=str)})
+                else:
+                    bulk_jobs.delete(guild, job)
+        await report(final=True)
+        return result
+
+
+async def benchmark(channels=300, latency=0.08, error_rate=0.02, concurrency=8):
+    """Compare a sequential permission fan-out with BulkExecutor on a fake guild."""
+    import random
+    from types import SimpleNamespace
+
+    class FakeChannel:
+        def __init__(self, channel_id):
+            self.id = channel_id
+
+        async def set_permissions(self, target, **overwrites):
+            await asyncio.sleep(latency)
+            if random.random() < error_rate:
+                raise discord.HTTPException(SimpleNamespace(status=500, reason="Internal Server Error"), "fake outage")
+
+    fake = [FakeChannel(i) for i in range(channels)]
+
+    async def apply(channel):
+        await channel.set_permissions(None, send_messages=False)
+
+    started = time.perf_counter()
+    sequential_failed = 0
+    for channel in fake:
+        try:
+            await apply(channel)
+        except discord.HTTPException:
+            sequential_failed += 1
+    sequential = time.perf_counter() - started
+
+    executor = BulkExecutor(concurrency=concurrency, backoff=0.05)
+    started = time.perf_counter()
+    result = await executor.run(fake, apply, key=lambda c: c.id, bucket=lambda c: c.id)
+    concurrent = time.perf_counter() - started
+
+    print(f"{channels} channels, {latency * 1000:.0f} ms per request, {error_rate:.0%} transient errors")
+    print(f"  sequential: {sequential:.2f} s ({sequential_failed} failed)")
+    print(f"  BulkExecutor(concurrency={concurrency}): {concurrent:.2f} s ({result.summary()})")
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
@@ -1,45 +1,130 @@
 import platform
-import importlib.util
 import os
-import sys
+from controller.registry import registry, default_modals_dir
+from controller.settings_bus import settings_bus
+
+def _set_commands(bot, name, command_names):
+    """Record which commands a controller owns."""
+    bot._controller_commands[name] = sorted(command_names)
+    for command_name in command_names:
+        bot._command_owners[command_name] = name
+
+def _drop_commands(bot, name):
+    """Remove a controller's commands from the bot and from the ownership records."""
+    for command_name in bot._controller_commands.pop(name, []):
+        bot.remove_command(command_name)
+        if bot._command_owners.get(command_name) == name:
+            del bot._command_owners[command_name]
+
+def _listeners(bot):
+    """Return the bot's {event: [listener]} map (py-cord 2.7 renamed extra_events)."""
+    listeners = getattr(bot, "extra_events", None)
+    return listeners if listeners is not None else bot._event_handlers
+
+def load_controller(bot, name, cls, path):
+    """Instantiate one controller and record the commands and listeners it registers."""
+    commands_before = set(bot.all_commands)
+    listeners_before = {event: list(funcs) for event, funcs in _listeners(bot).items()}
+
+    def registered_since():
+        new_commands = {bot.all_commands[n].name for n in set(bot.all_commands) - commands_before}
+        new_listeners = [
+            (event, func)
+            for event, funcs in _listeners(bot).items()
+            for func in funcs
+            if func not in listeners_before.get(event, [])
+        ]
+        return new_commands, new_listeners
+
+    try:
+        controller = cls(bot)
+    except Exception:
+        # Do not leave half-registered commands behind
+        new_commands, new_listeners = registered_since()
+        for command_name in new_commands:
+            bot.remove_command(command_name)
+        for event, func in new_listeners:
+            bot.remove_listener(func, event)
+        raise
+
+    new_commands, new_listeners = registered_since()
+
+    def on_settings_changed(diff):
+        controller.settings.update(diff)
+        hook = getattr(controller, "on_settings_changed", None)
+        if hook:
+            hook(diff)
+
+    settings_bus.subscribe(name, on_settings_changed)
+    bot._controller_subscriptions[name] = on_settings_changed
+    bot.controllers.append(name)  # Store controller name
+    bot._controllers.append(controller)
+    bot._controller_index[name] = controller
+    bot._controller_sources[name] = path
+    _set_commands(bot, name, new_commands)
+    bot._controller_listeners[name] = new_listeners
+    return controller
+
+def unload_controller(bot, name):
+    """Remove a controller together with its commands and listeners."""
+    controller = bot.get_controller(name)
+    if controller is None:
+        return False
+    teardown = getattr(controller, "teardown", None)
+    if teardown:
+        try:
+            teardown()
+        except Exception as e:
+            bot.log_message(f"Error tearing down {name}: {str(e)}", level="error", controller=name)
+    _drop_commands(bot, name)
+    for event, func in bot._controller_listeners.pop(name, []):
+        bot.remove_listener(func, event)
+    subscription = bot._controller_subscriptions.pop(name, None)
+    if subscription:
+        settings_bus.unsubscribe(name, subscription)
+    bot._controller_sources.pop(name, None)
+    bot._controllers.remove(controller)
+    bot._controller_index.pop(name, None)
+    if name in bot.controllers:
+        bot.controllers.remove(name)
+    return True
+
+def refresh_commands(bot, name):
+    """Drop a controller's commands and let it register them again (e.g. after an "enabled" flag flips)."""
+    controller = bot.get_controller(name)
+    if controller is None:
+        return
+    _drop_commands(bot, name)
+    commands_before = set(bot.all_commands)
+    controller.register_commands()
+    _set_commands(bot, name, {bot.all_commands[n].name for n in set(bot.all_commands) - commands_before})
 
 def load_controllers(bot):
     """Dynamically load controller modules from the 'controller/modals' directory."""
     bot.controllers = [] # Store controller names
     if platform.system() == "Emscripten" or os is None:
-        bot.log_message("Dynamic module loading not supported in Pyodide")
+        bot.log_message("Dynamic module loading not supported in Pyodide", level="warning")
         return
 
-    modals_dir = "controller/modals" # Directory where controller modules are located
+    modals_dir = default_modals_dir() # Directory where controller modules are located
     bot.log_message(f"Checking for {modals_dir} directory")
     try:
         os.makedirs(modals_dir, exist_ok=True)
         bot.log_message(f"Ensured {modals_dir} directory exists")
     except Exception as e:
-        bot.log_message(f"Error creating {modals_dir} directory: {str(e)}")
+        bot.log_message(f"Error creating {modals_dir} directory: {str(e)}", level="error")
         return
 
     if not os.path.exists(modals_dir):
-        bot.log_message(f"Warning: {modals_dir} directory does not exist or is inaccessible")
+        bot.log_message(f"Warning: {modals_dir} directory does not exist or is inaccessible", level="warning")
         return
 
-    for filename in sorted(os.listdir(modals_dir)):
-
-        if filename.startswith("controller_") and filename.endswith(".py"):
-            module_name = filename[:-3]
-            bot.log_message(f"Attempting to load {filename}")
+    # Unchanged files are served from the registry cache without re-executing them
+    for path, classes in registry.discover(modals_dir, lambda message: bot.log_message(message, level="error")):
+        filename = os.path.basename(path)
+        for attr_name, attr in classes.items():
             try:
-                spec = importlib.util.spec_from_file_location(module_name, os.path.join(modals_dir, filename))
-                module = importlib.util.module_from_spec(spec)
-                sys.modules[module_name] = module
-                spec.loader.exec_module(module)
-
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if isinstance(attr, type) and attr_name.startswith("Controller"):
-                        controller = attr(bot)
-                        bot.controllers.append(attr_name)  # Store controller name
-                        bot._controllers.append(controller)
-                        bot.log_message(f"Successfully loaded controller: {attr_name} from {filename}")
+                load_controller(bot, attr_name, attr, path)
+                bot.log_message(f"Successfully loaded controller: {attr_name} from {filename}", controller=attr_name)
             except Exception as e:
-                bot.log_message(f"Error loading {filename}: {str(e)}")
\ No newline at end of file
+                bot.log_message(f"Error loading {filename}: {str(e)}", level="error", controller=attr_name)
@@ -0,0 +1,27 @@
+import sys
+import time
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB, or None if unavailable."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def startup_report(label, started):
+    """Format the cold-start time since `started` (a perf_counter value) and the peak RSS."""
+    elapsed = (time.perf_counter() - started) * 1000
+    rss = peak_rss_mb()
+    rss_text = f"{rss:.1f} MB" if rss is not None else "n/a"
+    return f"⏱️ {label} cold start: {elapsed:.0f} ms, peak RSS {rss_text}"
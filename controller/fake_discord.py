@@ -0,0 +1,399 @@
+"""Local stand-in for Discord's gateway and REST API, with a load generator for controller benchmarks.
+
+    python -m controller.fake_discord --rate 50 --duration 20 --mix ping=8,kick=1,ban=1
+
+starts the stand-in, connects a ControllerBot to it (controllers come from controller/modals
+as usual), replays synthetic MESSAGE_CREATE traffic and reports commands/sec and latency
+percentiles per controller. With --serve it only runs the stand-in; point a bot at it by
+setting DISCORD_API_BASE to the printed URL.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from aiohttp import web, WSMsgType
+from controller.api_base import use_api_base
+from controller.metrics import percentile
+
+API_PATH = "/api/v10"
+
+
+def _json(body, status=200, headers=None):
+    # py-cord compares the content type exactly, so no "; charset=" suffix
+    return web.Response(body=json.dumps(body).encode(), status=status,
+                        headers={**(headers or {}), "Content-Type": "application/json"})
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FakeDiscord:
+    """Just enough gateway + REST for ControllerBot: one guild, text channels, members and roles.
+
+    REST calls are recorded per route template; channel message routes are rate limited per
+    channel with Discord-style X-RateLimit-* headers and 429 responses.
+    """
+    def __init__(self, host="127.0.0.1", port=0, channels=20, members=200, bucket_limit=5, bucket_window=5.0,
+                 heartbeat_interval=41.25, ack_delay=0.05):
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval  # seconds; short values sample bot.latency more often
+        self.ack_delay = ack_delay  # simulated round trip; an instant local ACK races py-cord's latency bookkeeping
+        self._ids = itertools.count(100000000000000000)
+        self.bot_user = self._user("controller-bot", bot=True)
+        self.owner = self._user("owner")
+        self.application_id = self._snowflake()
+        self.guild_id = self._snowflake()
+        self.channels = [
+            {"id": self._snowflake(), "type": 0, "guild_id": self.guild_id, "name": f"channel-{i}",
+             "position": i, "permission_overwrites": [], "nsfw": False, "parent_id": None,
+             "topic": None, "rate_limit_per_user": 0, "last_message_id": None}
+            for i in range(channels)
+        ]
+        self.members = [self._user(f"member-{i}") for i in range(members)]
+        self.roles = [self._role("@everyone", role_id=self.guild_id, permissions="104324673")]
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self._buckets = {}  # bucket (see _bucket) -> (window start, used)
+        self.calls = Counter()  # "METHOD /route/{id}" -> count
+        self.rate_limited = 0
+        self.sessions = set()
+        self.on_rest = None  # callback(method, path, match_info, payload) for load generators
+        self._runner = None
+
+    # --- payloads -----------------------------------------------------------------
+
+    def _snowflake(self):
+        return str(next(self._ids))
+
+    def _user(self, name, bot=False):
+        return {"id": self._snowflake(), "username": name, "discriminator": "0", "global_name": name,
+                "avatar": None, "bot": bot}
+
+    def _role(self, name, role_id=None, permissions="0"):
+        return {"id": role_id or self._snowflake(), "name": name, "permissions": permissions,
+                "position": len(getattr(self, "roles", ())), "color": 0,
+                "colors": {"primary_color": 0, "secondary_color": None, "tertiary_color": None},
+                "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+
+    def _member(self, user):
+        return {"user": user, "roles": [], "joined_at": _now(), "deaf": False, "mute": False, "flags": 0}
+
+    def guild_payload(self):
+        return {
+            "id": self.guild_id, "name": "Fake Guild", "owner_id": self.owner["id"], "icon": None,
+            "member_count": len(self.members) + 2, "large": False, "unavailable": False,
+            "roles": self.roles, "channels": self.channels, "threads": [], "emojis": [], "stickers": [],
+            "features": [], "voice_states": [], "presences": [], "stage_instances": [],
+            "guild_scheduled_events": [], "afk_channel_id": None, "afk_timeout": 300,
+            "verification_level": 0, "default_message_notifications": 0, "explicit_content_filter": 0,
+            "mfa_level": 0, "nsfw_level": 0, "premium_tier": 0, "system_channel_flags": 0,
+            "preferred_locale": "en-US", "joined_at": _now(),
+            "members": [self._member(u) for u in (self.bot_user, self.owner, *self.members)],
+        }
+
+    def message_payload(self, channel_id, content, mentions=()):
+        return {
+            "id": self._snowflake(), "channel_id": channel_id, "guild_id": self.guild_id,
+            "author": self.owner, "member": {"roles": [], "joined_at": _now(), "deaf": False, "mute": False},
+            "content": content, "timestamp": _now(), "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mention_roles": [], "attachments": [], "embeds": [], "pinned": False,
+            "type": 0, "flags": 0, "components": [],
+            "mentions": [dict(u, member={"roles": [], "joined_at": _now(), "deaf": False, "mute": False}) for u in mentions],
+        }
+
+    # --- gateway --------------------------------------------------------------------
+
+    async def dispatch(self, event, data):
+        """Send a gateway event to every connected session."""
+        for session in list(self.sessions):
+            await session.send(event, data)
+
+    async def gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = _GatewaySession(ws)
+        await ws.send_json({"op": 10, "d": {"heartbeat_interval": int(self.heartbeat_interval * 1000)}})
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(msg.data)
+                op = payload.get("op")
+                if op == 1:
+                    asyncio.create_task(self._heartbeat_ack(ws))
+                elif op in (2, 6):  # IDENTIFY / RESUME
+                    shard = (payload.get("d") or {}).get("shard") or [0, 1]
+                    await session.send("READY", {
+                        "v": 10, "user": self.bot_user, "session_id": "fake-session",
+                        "resume_gateway_url": f"ws://{self.host}:{self.port}/gateway",
+                        "guilds": [{"id": self.guild_id, "unavailable": True}],
+                        "application": {"id": self.application_id, "flags": 0}, "shard": shard,
+                    })
+                    await session.send("GUILD_CREATE", self.guild_payload())
+                    self.sessions.add(session)
+        finally:
+            self.sessions.discard(session)
+        return ws
+
+    async def _heartbeat_ack(self, ws):
+        await asyncio.sleep(self.ack_delay)
+        if not ws.closed:
+            await ws.send_json({"op": 11})
+
+    # --- REST -----------------------------------------------------------------------
+
+    @staticmethod
+    def _bucket(method, parts):
+        """Return the rate-limit bucket of a REST call, or None for routes served without limits.
+
+        Like Discord, buckets are per route and per major parameter (channel or guild id),
+        so bans in one guild do not slow down role edits or bans elsewhere.
+        """
+        if parts[0] == "channels" and len(parts) > 2 and parts[2] in ("messages", "permissions"):
+            return f"{parts[2]}-{parts[1]}"
+        if parts[0] == "guilds" and len(parts) > 2 and method != "GET":
+            if parts[2] == "members" and len(parts) > 4 and parts[4] == "roles":
+                return f"member-roles-{parts[1]}"
+            if parts[2] in ("bans", "bulk-ban", "members", "roles"):
+                return f"{parts[2]}-{parts[1]}"
+        return None
+
+    def _rate_limit_headers(self, bucket):
+        """Advance `bucket`; returns (headers, retry_after or None)."""
+        now = time.monotonic()
+        start, used = self._buckets.get(bucket, (now, 0))
+        if now - start >= self.bucket_window:
+            start, used = now, 0
+        reset_after = self.bucket_window - (now - start)
+        if used >= self.bucket_limit:
+            return {"Via": "fake-discord", "X-RateLimit-Bucket": bucket}, reset_after
+        used += 1
+        self._buckets[bucket] = (start, used)
+        return {
+            "X-RateLimit-Limit": str(self.bucket_limit),
+            "X-RateLimit-Remaining": str(self.bucket_limit - used),
+            "X-RateLimit-Reset": str(time.time() + reset_after),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": bucket,
+        }, None
+
+    async def rest(self, request):
+        path = request.match_info["path"]
+        template = "/" + re.sub(r"\d{5,}", "{id}", path)
+        self.calls[f"{request.method} {template}"] += 1
+        payload = None
+        if request.can_read_body:
+            try:
+                payload = await request.json()
+            except Exception:
+                payload = None  # multipart uploads are recorded but not parsed
+        parts = path.split("/")
+        headers = {}
+
+        bucket = self._bucket(request.method, parts)
+        if bucket is not None:
+            headers, retry_after = self._rate_limit_headers(bucket)
+            if retry_after is not None:
+                self.rate_limited += 1
+                return _json(
+                    {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                    status=429, headers=headers,
+                )
+
+        if self.on_rest:
+            self.on_rest(request.method, parts, payload)
+        body = await self._rest_response(request.method, parts, payload)
+        if body is None:
+            return web.Response(status=204, headers=headers)
+        return _json(body, headers=headers)
+
+    async def _rest_response(self, method, parts, payload):
+        if parts[:2] == ["users", "@me"]:
+            return self.bot_user
+        if parts[0] == "gateway":
+            return {"url": f"ws://{self.host}:{self.port}/gateway", "shards": 1,
+                    "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}}
+        if parts[0] == "applications":
+            return [] if method in ("GET", "PUT") else {}
+        if parts[0] == "channels" and len(parts) >= 3 and parts[2] == "messages":
+            message = self.message_payload(parts[1], (payload or {}).get("content") or "")
+            message["author"] = self.bot_user
+            if len(parts) == 4:
+                message["id"] = parts[3]
+            return message
+        if parts[0] == "guilds" and len(parts) == 3 and parts[2] == "roles" and method == "POST":
+            role = self._role((payload or {}).get("name", "new role"))
+            self.roles.append(role)
+            # Real Discord follows up with a gateway event; controllers rely on it to update caches
+            asyncio.get_running_loop().call_later(0.05, lambda: asyncio.ensure_future(
+                self.dispatch("GUILD_ROLE_CREATE", {"guild_id": self.guild_id, "role": role})))
+            return role
+        if parts[0] == "guilds" and len(parts) == 3 and parts[2] == "bulk-ban":
+            return {"banned_users": [str(i) for i in (payload or {}).get("user_ids", [])], "failed_users": []}
+        if method == "GET":
+            return {}
+        return None
+
+    # --- lifecycle --------------------------------------------------------------------
+
+    @property
+    def api_base(self):
+        return f"http://{self.host}:{self.port}{API_PATH}"
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/gateway", self.gateway)
+        app.router.add_route("*", API_PATH + "/{path:.*}", self.rest)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self.api_base
+
+    async def stop(self):
+        for session in list(self.sessions):
+            await session.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class _GatewaySession:
+    def __init__(self, ws):
+        self.ws = ws
+        self.seq = 0
+
+    async def send(self, event, data):
+        self.seq += 1
+        await self.ws.send_json({"op": 0, "t": event, "s": self.seq, "d": data})
+
+
+class LoadGenerator:
+    """Sends synthetic commands at a fixed rate and times them until the bot's first reply."""
+    def __init__(self, server, mix, prefix="!"):
+        self.server = server
+        self.mix = mix  # [(command, weight)]
+        self.prefix = prefix
+        self._pending = defaultdict(deque)  # channel id -> (command, sent_at)
+        self.latencies = defaultdict(list)  # command -> [ms]
+        self.sent = Counter()
+        server.on_rest = self._on_rest
+
+    def _content(self, command):
+        target = random.choice(self.server.members)
+        if command in ("ban", "kick", "mute"):
+            return f"{self.prefix}{command} <@{target['id']}> load test", [target]
+        return f"{self.prefix}{command}", []
+
+    def _on_rest(self, method, parts, payload):
+        if method == "POST" and parts[0] == "channels" and len(parts) == 3 and parts[2] == "messages":
+            pending = self._pending.get(parts[1])
+            if pending:
+                command, sent_at = pending.popleft()
+                self.latencies[command].append((time.perf_counter() - sent_at) * 1000)
+
+    async def run(self, rate, duration):
+        commands = [c for c, _ in self.mix]
+        weights = [w for _, w in self.mix]
+        interval = 1.0 / rate
+        started = time.perf_counter()
+        next_at = started
+        while time.perf_counter() - started < duration:
+            command = random.choices(commands, weights)[0]
+            channel = random.choice(self.server.channels)["id"]
+            content, mentions = self._content(command)
+            self._pending[channel].append((command, time.perf_counter()))
+            self.sent[command] += 1
+            await self.server.dispatch("MESSAGE_CREATE", self.server.message_payload(channel, content, mentions))
+            next_at += interval
+            await asyncio.sleep(max(0, next_at - time.perf_counter()))
+        return time.perf_counter() - started
+
+    async def drain(self, timeout):
+        """Wait until every sent command got its reply, or until `timeout` seconds passed."""
+        deadline = time.perf_counter() + timeout
+        while any(self._pending.values()) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+
+    def report(self, elapsed, owner_of=lambda command: command):
+        """Return report lines: throughput and p50/p95/p99 per controller."""
+        completed = sum(len(v) for v in self.latencies.values())
+        lines = [f"Sent {sum(self.sent.values())} commands in {elapsed:.1f} s, "
+                 f"{completed / elapsed:.1f} answered/s, {self.server.rate_limited} rate-limited REST calls"]
+        per_owner = defaultdict(list)
+        for command, values in self.latencies.items():
+            per_owner[owner_of(command)].extend(values)
+        for owner, values in sorted(per_owner.items()):
+            values.sort()
+            lines.append(f"  {owner}: {len(values)} answered, p50 {percentile(values, 0.5):.1f} ms, "
+                         f"p95 {percentile(values, 0.95):.1f} ms, p99 {percentile(values, 0.99):.1f} ms")
+        lines.append("REST calls: " + ", ".join(f"{k} ×{v}" for k, v in self.server.calls.most_common(8)))
+        return lines
+
+
+def parse_mix(text):
+    mix = []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+async def run_benchmark(args):
+    from controller.bot import ControllerBot
+    from controller.log_pipeline import log_pipeline
+
+    server = FakeDiscord(port=args.port, channels=args.channels, members=args.members,
+                         bucket_limit=args.bucket_limit, bucket_window=args.bucket_window,
+                         heartbeat_interval=args.heartbeat_interval)
+    use_api_base(await server.start())
+    if args.serve:
+        print(f"Fake Discord API at {server.api_base}; press Ctrl+C to stop")
+        await asyncio.Event().wait()
+
+    log_pipeline.subscribe(lambda r: r["level"] in ("warning", "error") and print(f"[{r['level'].upper()}] {r['message']}"))
+    bot = ControllerBot("fake-token")
+    generator = LoadGenerator(server, parse_mix(args.mix), prefix=bot.settings.get("default_prefix", "!"))
+    bot_task = asyncio.create_task(bot.start("fake-token"))
+    ready = asyncio.create_task(bot.wait_until_ready())
+    await asyncio.wait([ready, bot_task], timeout=30, return_when=asyncio.FIRST_COMPLETED)
+    if bot_task.done():
+        bot_task.result()  # login or gateway failure: surface it instead of timing out
+    if not ready.done():
+        raise TimeoutError("bot did not become ready against the fake API")
+    print(f"Bot connected with controllers {bot.controllers}; sending {args.rate}/s for {args.duration} s")
+    elapsed = await generator.run(args.rate, args.duration)
+    await generator.drain(timeout=15.0)  # replies queued behind rate limits still count
+    for line in generator.report(elapsed, lambda c: bot.get_command_owner(c) or c):
+        print(line)
+    bot_task.cancel()
+    await asyncio.gather(bot_task, return_exceptions=True)
+    await bot.close()
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark controllers against a local fake Discord.")
+    parser.add_argument("--rate", type=float, default=20, help="commands per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of traffic")
+    parser.add_argument("--mix", default="ping=1", help="weighted commands, e.g. ping=8,kick=1,ban=1")
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--bucket-limit", type=int, default=5, help="requests per route bucket per window")
+    parser.add_argument("--bucket-window", type=float, default=5.0)
+    parser.add_argument("--heartbeat-interval", type=float, default=41.25, help="gateway heartbeat interval, seconds")
+    parser.add_argument("--serve", action="store_true", help="only run the fake API")
+    parser.add_argument("--port", type=int, default=0, help="port for --serve (default: any free port)")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+from controller.controllers import load_controller, unload_controller
+from controller.registry import registry, default_modals_dir
+
+
+class ControllerReloader:
+    """Watches controller/modals and hot-swaps changed controllers on a live bot."""
+    def __init__(self, bot, modals_dir=None, interval=1.0):
+        self.bot = bot
+        self.modals_dir = modals_dir or default_modals_dir()
+        self.interval = interval
+        self._stamps = self._scan()
+
+    def _scan(self):
+        """Return {path: (mtime_ns, size)} for every controller file."""
+        stamps = {}
+        try:
+            with os.scandir(self.modals_dir) as it:
+                for entry in it:
+                    if entry.name.startswith("controller_") and entry.name.endswith(".py"):
+                        st = entry.stat()
+                        stamps[entry.path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return stamps
+
+    async def run(self):
+        """Poll for changes while the bot's "hot_reload" setting is on."""
+        while not self.bot.is_closed():
+            await asyncio.sleep(self.interval)
+            if not self.bot.settings.get("hot_reload", False):
+                continue
+            stamps = self._scan()
+            changed = [p for p in set(stamps) | set(self._stamps) if stamps.get(p) != self._stamps.get(p)]
+            self._stamps = stamps
+            for path in sorted(changed):
+                self.reload_path(path)
+
+    def reload_path(self, path):
+        """Unload the controllers defined in one file and load it again."""
+        bot = self.bot
+        filename = os.path.basename(path)
+        start = time.perf_counter()
+
+        old_names = [name for name, src in bot._controller_sources.items() if src == path]
+        for name in old_names:
+            unload_controller(bot, name)
+
+        classes = registry.load_path(path, lambda message: bot.log_message(message, level="error"))
+        if classes is None:
+            elapsed = (time.perf_counter() - start) * 1000
+            bot.log_message(f"♻️ Unloaded {filename} ({', '.join(old_names) or 'no controllers'}) in {elapsed:.1f} ms", latency_ms=round(elapsed, 2))
+            return
+
+        loaded = []
+        for name, cls in classes.items():
+            try:
+                load_controller(bot, name, cls, path)
+                loaded.append(name)
+            except Exception as e:
+                bot.log_message(f"Error loading {filename}: {str(e)}", level="error", controller=name)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        bot.log_message(f"♻️ Reloaded {filename} ({', '.join(loaded) or 'no controllers'}) in {elapsed:.1f} ms", latency_ms=round(elapsed, 2))
@@ -0,0 +1,144 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class LogPipeline:
+    """Structured log stream: redacts once, fans out to subscribers and batches records to a JSON-lines file."""
+    def __init__(self, backlog=500):
+        self._subscribers = []
+        self._secrets = {}
+        self._backlog = deque(maxlen=backlog)
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def set_secret(self, name, value):
+        """Register a value (e.g. the bot token) that must never appear in records."""
+        with self._lock:
+            if value:
+                self._secrets[name] = value
+            else:
+                self._secrets.pop(name, None)
+
+    def redact(self, text):
+        """Replace every registered secret with [HIDDEN]."""
+        for secret in self._secrets.values():
+            if secret in text:
+                text = text.replace(secret, "[HIDDEN]")
+        return text
+
+    def subscribe(self, callback, replay=True):
+        """Call callback(record) for every new record, optionally replaying recent ones first."""
+        with self._lock:
+            self._subscribers.append(callback)
+            backlog = list(self._backlog) if replay else []
+        for record in backlog:
+            callback(record)
+
+    def unsubscribe(self, callback):
+        """Stop delivering records to callback."""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def emit(self, message, level="info", **fields):
+        """Build a record (level, message, controller, guild, command, latency_ms, ...) and publish it."""
+        record = {"ts": round(time.time(), 3), "level": level, "message": self.redact(str(message))}
+        for key, value in fields.items():
+            if value is not None:
+                record[key] = self.redact(value) if isinstance(value, str) else value
+        with self._lock:
+            self._backlog.append(record)
+            subscribers = list(self._subscribers)
+            if self._queue is not None:
+                self._queue.put_nowait(record)
+        for callback in subscribers:
+            try:
+                callback(record)
+            except Exception:
+                pass
+        return record
+
+    def start(self, path=os.path.join("logs", "bot.jsonl"), max_bytes=5 * 1024 * 1024, backups=3):
+        """Start the background file writer; records already in the backlog are written first."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._queue = queue.Queue()
+            for record in self._backlog:
+                self._queue.put_nowait(record)
+            self._thread = threading.Thread(
+                target=self._writer, args=(path, max_bytes, backups), name="log-writer", daemon=True
+            )
+            self._thread.start()
+
+    def close(self):
+        """Flush queued records to disk and stop the writer."""
+        with self._lock:
+            thread, q = self._thread, self._queue
+            self._thread = self._queue = None
+        if thread is not None:
+            q.put(None)
+            thread.join(timeout=5)
+
+    @staticmethod
+    def _rotate(path, backups):
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        if os.path.exists(path):
+            os.replace(path, f"{path}.1")
+
+    def _writer(self, path, max_bytes, backups):
+        """Writer thread: drain the queue in batches and append them to the log file."""
+        q = self._queue
+        f = None
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(path, "a", encoding="utf-8")
+            running = True
+            while running:
+                batch = [q.get()]
+                while len(batch) < 1000:
+                    try:
+                        batch.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    running = False
+                    batch = [r for r in batch if r is not None]
+                f.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch))
+                f.flush()
+                if f.tell() >= max_bytes:
+                    f.close()
+                    self._rotate(path, backups)
+                    f = open(path, "a", encoding="utf-8")
+        except Exception as e:
+            self._writer_failed(q, path, e)
+        finally:
+            if f is not None:
+                f.close()
+
+    def _writer_failed(self, q, path, error):
+        """Detach a dead writer so emit() stops queueing records nobody drains, and say so."""
+        with self._lock:
+            if self._queue is q:
+                self._queue = None
+                self._thread = None
+        message = f"Log file writer stopped, records are no longer written to {path}: {str(error)}"
+        print(message, file=sys.stderr)
+        self.emit(message, level="error", controller="log_pipeline")
+
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.close)
@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at `fraction` (0..1) of an already sorted list (nearest rank)."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class MetricsRegistry:
+    """Low-overhead in-process metrics: time series, per-command latencies and error counts.
+
+    Writers only append to bounded deques under a lock; percentiles are computed when a
+    reader asks for a snapshot. `version` grows with every change so readers can skip
+    redrawing when nothing new arrived.
+    """
+    def __init__(self, window=120, command_samples=1000):
+        self.window = window
+        self.command_samples = command_samples
+        self.version = 0
+        self._series = {}  # name -> deque of floats, one per tick
+        self._commands = {}  # command -> {"latencies": deque, "count": int, "errors": int}
+        self._commands_total = 0
+        self._errors_total = 0
+        self._commands_at_tick = 0
+        self._lock = threading.Lock()
+
+    def _command(self, name):
+        stats = self._commands.get(name)
+        if stats is None:
+            stats = {"latencies": deque(maxlen=self.command_samples), "count": 0, "errors": 0}
+            self._commands[name] = stats
+        return stats
+
+    def add_sample(self, series, value):
+        """Append one value to a time series (e.g. "heartbeat_ms", "loop_lag_ms")."""
+        with self._lock:
+            values = self._series.get(series)
+            if values is None:
+                values = self._series[series] = deque(maxlen=self.window)
+            values.append(value)
+            self.version += 1
+
+    def record_command(self, name, latency_ms):
+        """Record one completed command and its handler latency."""
+        with self._lock:
+            stats = self._command(name)
+            stats["count"] += 1
+            if latency_ms is not None:
+                stats["latencies"].append(latency_ms)
+            self._commands_total += 1
+            self.version += 1
+
+    def record_error(self, name):
+        """Record one failed command (name may be None for unknown commands)."""
+        with self._lock:
+            self._command(name or "?")["errors"] += 1
+            self._errors_total += 1
+            self.version += 1
+
+    def tick(self, interval):
+        """Turn the commands completed since the last tick into a commands/sec sample."""
+        with self._lock:
+            done = self._commands_total - self._commands_at_tick
+            self._commands_at_tick = self._commands_total
+        self.add_sample("commands_per_sec", done / interval)
+
+    def snapshot(self):
+        """Return a plain-dict copy of everything, with p50/p95/p99 per command."""
+        with self._lock:
+            series = {name: list(values) for name, values in self._series.items()}
+            commands = {
+                name: (list(stats["latencies"]), stats["count"], stats["errors"])
+                for name, stats in self._commands.items()
+            }
+            snapshot = {
+                "version": self.version,
+                "commands_total": self._commands_total,
+                "errors_total": self._errors_total,
+                "series": series,
+            }
+        per_command = {}
+        for name, (latencies, count, errors) in commands.items():
+            latencies.sort()
+            per_command[name] = {
+                "count": count,
+                "errors": errors,
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "p99": percentile(latencies, 0.99),
+            }
+        snapshot["commands"] = per_command
+        return snapshot
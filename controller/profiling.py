@@ -0,0 +1,137 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CommandProfiler:
+    """Per-controller command stats (calls, time, errors) with optional cProfile capture."""
+    def __init__(self):
+        self._stats = {}  # (controller, command) -> {"calls", "errors", "total_ms", "max_ms", "last_error"}
+        self._profiled = set()  # controllers with cProfile switched on
+        self._profiles = {}  # controller -> cProfile.Profile
+        self._active = {}  # controller -> number of its commands currently running under the profiler
+        self._running = None  # controller whose profile is enabled (at most one per thread)
+        self._lock = threading.Lock()
+
+    def _entry(self, controller, command):
+        key = (controller, command)
+        entry = self._stats.get(key)
+        if entry is None:
+            entry = self._stats[key] = {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_error": None}
+        return entry
+
+    def is_profiling(self, controller):
+        return controller in self._profiled
+
+    def set_profiling(self, controller, enabled):
+        """Switch cProfile capture for one controller's commands on or off."""
+        with self._lock:
+            if enabled:
+                self._profiled.add(controller)
+                self._profiles.setdefault(controller, cProfile.Profile())
+            else:
+                self._profiled.discard(controller)
+
+    def _enable_profile(self, controller):
+        """Count one invocation under the controller's profile, starting it if needed; True if counted.
+
+        One cProfile per thread: since 3.12 a second enable() raises ValueError and
+        sys.getprofile() no longer shows a running one, so the running profile is tracked here.
+        """
+        if controller not in self._profiled:
+            return False
+        depth = self._active.get(controller, 0)
+        if not depth:
+            if self._running is not None or sys.getprofile() is not None:
+                return False
+            try:
+                self._profiles[controller].enable()
+            except Exception:
+                return False  # another profiling tool is active
+            self._running = controller
+        self._active[controller] = depth + 1
+        return True
+
+    def _disable_profile(self, controller):
+        """Uncount one invocation; the last one to finish stops the profile."""
+        depth = self._active[controller] - 1
+        self._active[controller] = depth
+        if not depth:
+            self._profiles[controller].disable()
+            self._running = None
+
+    @contextmanager
+    def measure(self, controller, command):
+        """Time one command invocation; yields a dict whose "ms" holds the duration afterwards.
+
+        cProfile follows the thread, not the task: while a profiled command awaits, other
+        coroutines on the same loop are attributed to it as well.
+        """
+        counted = self._enable_profile(controller)
+        timing = {"ms": None}
+        started = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            elapsed = timing["ms"] = (time.perf_counter() - started) * 1000
+            if counted:
+                self._disable_profile(controller)
+            with self._lock:
+                entry = self._entry(controller, command)
+                entry["calls"] += 1
+                entry["total_ms"] += elapsed
+                entry["max_ms"] = max(entry["max_ms"], elapsed)
+
+    def record_error(self, controller, command, error):
+        """Count an exception raised by a command."""
+        with self._lock:
+            entry = self._entry(controller, command)
+            entry["errors"] += 1
+            entry["last_error"] = f"{type(error).__name__}: {error}"
+
+    def summary(self):
+        """Return per-controller totals sorted by time spent, busiest first."""
+        with self._lock:
+            rows = [dict(entry, controller=c, command=cmd) for (c, cmd), entry in self._stats.items()]
+        controllers = {}
+        for row in rows:
+            total = controllers.setdefault(row["controller"], {"calls": 0, "errors": 0, "total_ms": 0.0, "commands": []})
+            total["calls"] += row["calls"]
+            total["errors"] += row["errors"]
+            total["total_ms"] += row["total_ms"]
+            row["avg_ms"] = row["total_ms"] / row["calls"] if row["calls"] else 0.0
+            total["commands"].append(row)
+        for total in controllers.values():
+            total["commands"].sort(key=lambda r: r["total_ms"], reverse=True)
+        return dict(sorted(controllers.items(), key=lambda item: item[1]["total_ms"], reverse=True))
+
+    def export(self, directory="logs"):
+        """Write the aggregated stats as JSON and each idle profile as a .prof file; returns the JSON path.
+
+        Must run on the bot's thread: reading a profile stops it.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        report = {"exported_at": stamp, "controllers": self.summary(), "profiles": {}}
+        for controller, profile in list(self._profiles.items()):
+            if self._active.get(controller):
+                continue  # a command is still running under this profile
+            text = io.StringIO()
+            try:
+                stats = pstats.Stats(profile, stream=text)
+            except TypeError:
+                continue  # nothing captured yet
+            prof_path = os.path.join(directory, f"profile-{controller}-{stamp}.prof")
+            stats.dump_stats(prof_path)
+            stats.sort_stats("cumulative").print_stats(25)
+            report["profiles"][controller] = {"file": prof_path, "top": text.getvalue().splitlines()}
+        path = os.path.join(directory, f"command-stats-{stamp}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,123 @@
+import importlib.util
+import os
+import sys
+import threading
+from controller.schema import get_schema
+
+
+def default_modals_dir():
+    """Return the controller directory, including inside a frozen build."""
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, "controller", "modals")
+    return os.path.join("controller", "modals")
+
+
+class ControllerRegistry:
+    """Imports each controller_*.py once and caches its classes by path, mtime and size."""
+    def __init__(self):
+        self._entries = {}  # path -> {"stamp", "module", "classes", "schemas", "error"}
+        self._listings = {}  # modals_dir -> (dir stamp, [filenames])
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _stamp(st):
+        return (st.st_mtime_ns, st.st_size)
+
+    def _list(self, modals_dir):
+        """List controller files, reusing the last listing if the directory is unchanged."""
+        dir_stamp = self._stamp(os.stat(modals_dir))
+        cached = self._listings.get(modals_dir)
+        if cached and cached[0] == dir_stamp:
+            return cached[1]
+        filenames = sorted(
+            f for f in os.listdir(modals_dir)
+            if f.startswith("controller_") and f.endswith(".py")
+        )
+        self._listings[modals_dir] = (dir_stamp, filenames)
+        return filenames
+
+    def _import(self, path, stamp, log_message):
+        """Execute a controller module and collect the Controller* classes it defines."""
+        module_name = os.path.basename(path)[:-3]
+        entry = {"stamp": stamp, "module": None, "classes": {}, "schemas": {}, "error": None}
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+            entry["module"] = module
+            for attr_name in sorted(vars(module)):
+                attr = getattr(module, attr_name)
+                if (isinstance(attr, type) and attr_name.startswith("Controller")
+                        and attr.__module__ == module_name):
+                    entry["classes"][attr_name] = attr
+                    entry["schemas"][attr_name] = get_schema(attr)
+        except Exception as e:
+            entry["error"] = e
+            log_message(f"Error loading {os.path.basename(path)}: {str(e)}")
+        return entry
+
+    def discover(self, modals_dir=None, log_message=None):
+        """Return [(path, {name: class})] for every controller file, re-importing only changed files."""
+        modals_dir = modals_dir or default_modals_dir()
+        log_message = log_message or (lambda message: None)
+        with self._lock:
+            if not os.path.isdir(modals_dir):
+                return []
+
+            result = []
+            seen = set()
+            for filename in self._list(modals_dir):
+                path = os.path.join(modals_dir, filename)
+                seen.add(path)
+                classes = self.load_path(path, log_message)
+                if classes is not None:
+                    result.append((path, classes))
+
+            for path in [p for p in self._entries if os.path.dirname(p) == modals_dir and p not in seen]:
+                del self._entries[path]
+            return result
+
+    def load_path(self, path, log_message=None):
+        """Return {name: class} for one controller file, re-importing it only if it changed."""
+        log_message = log_message or (lambda message: None)
+        with self._lock:
+            try:
+                stamp = self._stamp(os.stat(path))
+            except OSError:
+                self._entries.pop(path, None)
+                return None
+            entry = self._entries.get(path)
+            if entry is None or entry["stamp"] != stamp:
+                entry = self._import(path, stamp, log_message)
+                self._entries[path] = entry
+            elif entry["error"] is not None:
+                log_message(f"Error loading {os.path.basename(path)}: {str(entry['error'])}")
+            return dict(entry["classes"])
+
+    def get_classes(self, modals_dir=None, log_message=None):
+        """Return {name: class} for all discovered controllers."""
+        classes = {}
+        for _, found in self.discover(modals_dir, log_message):
+            classes.update(found)
+        return classes
+
+    def get_schemas(self, modals_dir=None, log_message=None):
+        """Return {name: settings schema} for all discovered controllers without instantiating them."""
+        with self._lock:
+            schemas = {}
+            for path, _ in self.discover(modals_dir, log_message):
+                schemas.update(self._entries[path]["schemas"])
+            return schemas
+
+    def invalidate(self, path=None):
+        """Forget cached modules so the next discover() re-imports them."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._listings.clear()
+            else:
+                self._entries.pop(path, None)
+
+
+registry = ControllerRegistry()
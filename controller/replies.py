@@ -0,0 +1,49 @@
+from discord.ext import commands
+
+MESSAGE_LIMIT = 2000  # Discord's maximum message length
+
+
+def pack_replies(parts, limit=MESSAGE_LIMIT):
+    """Join reply texts with newlines into as few messages of at most `limit` characters as possible."""
+    messages = []
+    current = None
+    for part in parts:
+        if current is not None and len(current) + 1 + len(part) <= limit:
+            current += "\n" + part
+            continue
+        if current is not None:
+            messages.append(current)
+        current = part  # longer than `limit` on its own: sent as is and rejected as it would be unbuffered
+    if current is not None:
+        messages.append(current)
+    return messages
+
+
+class BufferedContext(commands.Context):
+    """Command context that can collect a handler's plain-text replies and send them as one message.
+
+    The bot switches buffering on for controllers with BUFFER_REPLIES = True. While it is on,
+    `send("text")` only queues the text and returns None; a send with anything else (embeds,
+    files, views, ...) first flushes the queue so replies keep their order, then goes out at
+    once and returns the Message as usual. The bot flushes the rest after the handler returns.
+    """
+    buffering = False
+
+    def __init__(self, **attrs):
+        super().__init__(**attrs)
+        self._replies = []
+
+    async def send(self, content=None, **kwargs):
+        if self.buffering and content is not None and not kwargs:
+            self._replies.append(str(content))
+            return None
+        await self.flush()
+        return await super().send(content, **kwargs)
+
+    async def flush(self):
+        """Send the queued replies; returns the number of messages sent."""
+        replies, self._replies = self._replies, []
+        messages = pack_replies(replies)
+        for text in messages:
+            await super().send(text)
+        return len(messages)
@@ -0,0 +1,79 @@
+import asyncio
+import queue
+import threading
+
+
+class BotThread:
+    """Runs ControllerBot on its own thread and event loop, isolated from the GUI frame loop."""
+    def __init__(self, token):
+        self.token = token
+        self.bot = None
+        self.status = queue.SimpleQueue()  # ("started", controllers) / ("error", message) / ("stopped", None)
+        self._loop = None
+        self._stop = None
+        self._stop_requested = False
+        self._thread = threading.Thread(target=self._run, name="discord-bot", daemon=True)
+
+    def start(self):
+        """Start the bot thread; progress is reported on `status`."""
+        self._thread.start()
+
+    def stop(self):
+        """Ask the bot to close; safe to call from any thread."""
+        self._stop_requested = True
+        loop, stop = self._loop, self._stop
+        if loop is not None and stop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def call(self, callback, *args):
+        """Run callback(*args) on the bot's loop."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self.status.put(("error", str(e)))
+        self.status.put(("stopped", None))
+
+    async def _main(self):
+        # Imported here so py-cord and the controllers load on the bot thread
+        from controller.bot import ControllerBot
+
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if self._stop_requested:
+            return
+
+        # Built inside the loop so the client, its tasks and settings bus subscriptions bind to this thread
+        bot = ControllerBot(self.token)
+        self.bot = bot
+        self.status.put(("started", list(bot.controllers)))
+
+        bot_task = asyncio.create_task(bot.start(self.token))
+        stop_task = asyncio.create_task(self._stop.wait())
+        await asyncio.wait({bot_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        stop_task.cancel()
+        if self._stop.is_set():
+            # Cancel instead of awaiting: after close() py-cord's reconnect loop fails on the closed session
+            bot_task.cancel()
+            await asyncio.gather(bot_task, return_exceptions=True)
+            if not bot.is_closed():
+                await bot.close()
+            return
+        if not bot.is_closed():
+            await bot.close()
+        try:
+            await bot_task
+        except asyncio.CancelledError:
+            pass
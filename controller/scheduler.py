@@ -0,0 +1,193 @@
+"""Persistent expiry timers (timed mutes and the like) served by one task per bot."""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from controller.log_pipeline import log_pipeline
+from controller.settings_store import SettingsStore
+
+
+def owns_guild(guild_id, shard_id=None, shard_count=None):
+    """Return True if `guild_id` is served by this shard (Discord's (id >> 22) % shard_count rule)."""
+    if not shard_count or shard_id is None:
+        return True
+    if guild_id is None:
+        return shard_id == 0  # timers that belong to no guild run on the first shard
+    return (int(guild_id) >> 22) % shard_count == shard_id
+
+
+class ExpiryScheduler:
+    """Heap of deadlines backed by one SettingsStore per guild; one task sleeps until the earliest one.
+
+    Timers live in `directory/<guild id>.json` (one section {"kind", "due", "data"} per timer),
+    so the layout does not depend on sharding: each bot loads the guilds its shard owns, and
+    changing shard_count only redistributes the files. Timers due within `batch_window`
+    seconds of each other fire together: the handler registered for their kind gets the
+    whole batch as a list of (key, data) and may return the entries to try again later.
+    """
+    MAX_SLEEP = 300.0  # re-check the clock at least this often (suspend, clock changes)
+    RETRY_DELAY = 60.0  # when a handler fails, hands entries back or is not registered yet
+
+    def __init__(self, directory="timers", shard_id=None, shard_count=None, batch_window=1.0):
+        self.directory = directory
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.batch_window = batch_window
+        self._stores = {}  # guild id (or None) -> SettingsStore
+        self._handlers = {}  # kind -> async callback(list of (key, data)) -> entries to retry or None
+        self._timers = {}  # key -> (due, seq, kind, data, guild id)
+        self._heap = []  # (due, seq, key); entries whose seq no longer matches _timers are stale
+        self._seq = itertools.count()
+        self._wake = None
+        self._loaded = False
+
+    def _store(self, guild_id):
+        store = self._stores.get(guild_id)
+        if store is None:
+            name = "global" if guild_id is None else str(guild_id)
+            store = self._stores[guild_id] = SettingsStore(os.path.join(self.directory, f"{name}.json"))
+        return store
+
+    def load(self):
+        """Rebuild the queue from the files of the guilds this shard owns."""
+        os.makedirs(self.directory, exist_ok=True)
+        timers = {}
+        for filename in os.listdir(self.directory):
+            name, ext = os.path.splitext(filename)
+            if ext != ".json" or not (name == "global" or name.isdigit()):
+                continue
+            guild_id = None if name == "global" else int(name)
+            if not owns_guild(guild_id, self.shard_id, self.shard_count):
+                continue
+            store = self._store(guild_id)
+            try:
+                entries = store.get_all()
+            except Exception as e:
+                log_pipeline.emit(f"Could not read timers from {filename}: {str(e)}", level="error", controller="scheduler")
+                continue
+            if not entries:
+                # Every timer of this guild has fired; only this shard writes the file
+                del self._stores[guild_id]
+                os.remove(store.path)
+                continue
+            for key, entry in entries.items():
+                try:
+                    timers[key] = (float(entry["due"]), next(self._seq), entry["kind"], entry.get("data", {}), guild_id)
+                except (KeyError, TypeError, ValueError):
+                    log_pipeline.emit(f"Dropping malformed timer {key!r}", level="warning", controller="scheduler")
+                    store.delete(key)
+        self._timers = timers
+        self._heap = [(due, seq, key) for key, (due, seq, _, _, _) in timers.items()]
+        heapq.heapify(self._heap)
+        self._loaded = True
+        return len(timers)
+
+    def register(self, kind, handler):
+        """Route expired timers of `kind` to handler(batch); a reloaded controller replaces its handler."""
+        self._handlers[kind] = handler
+
+    def unregister(self, kind, handler):
+        """Remove a handler (e.g. when its controller is unloaded); its timers wait for the next one."""
+        if self._handlers.get(kind) == handler:
+            del self._handlers[kind]
+
+    def schedule(self, key, kind, due, data=None, guild=None):
+        """Fire at `due` (epoch seconds); scheduling an existing key moves its deadline."""
+        if not self._loaded:
+            self.load()
+        data = data or {}
+        previous = self._timers.get(key)
+        if previous is not None and previous[4] != guild:
+            self._store(previous[4]).delete(key)
+        seq = next(self._seq)
+        self._timers[key] = (due, seq, kind, data, guild)
+        heapq.heappush(self._heap, (due, seq, key))
+        self._store(guild).set(key, {"kind": kind, "due": due, "data": data})
+        if self._wake is not None and self._heap[0][2] == key:
+            self._wake.set()  # new earliest deadline
+
+    def cancel(self, key):
+        """Forget a timer; its heap entry is skipped when it surfaces."""
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            self._store(timer[4]).delete(key)
+
+    def cancel_guild(self, guild_id):
+        """Forget every timer of a guild (e.g. after the bot left it)."""
+        for key in [key for key, timer in self._timers.items() if timer[4] == guild_id]:
+            self.cancel(key)
+
+    def pending(self, kind=None):
+        return sum(1 for timer in self._timers.values() if kind is None or timer[2] == kind)
+
+    def flush(self):
+        """Write every pending store change now."""
+        for store in list(self._stores.values()):
+            store.flush()
+
+    def next_due(self):
+        """Return the earliest live deadline, dropping stale heap entries on the way."""
+        while self._heap:
+            due, seq, key = self._heap[0]
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] == seq:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now):
+        """Remove and return every live timer due by `now`, grouped by kind, as (key, data, guild)."""
+        batches = {}
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return batches
+            _, _, key = heapq.heappop(self._heap)
+            _, _, kind, data, guild = self._timers.pop(key)
+            batches.setdefault(kind, []).append((key, data, guild))
+
+    async def run(self):
+        """Fire timers until cancelled."""
+        if not self._loaded:
+            count = self.load()
+            if count:
+                log_pipeline.emit(f"Restored {count} pending timers", controller="scheduler")
+        self._wake = asyncio.Event()
+        while True:
+            due = self.next_due()
+            delay = self.MAX_SLEEP if due is None else min(self.MAX_SLEEP, due - time.time())
+            if delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for kind, batch in self._pop_due(time.time() + self.batch_window).items():
+                await self._fire(kind, batch)
+
+    async def _fire(self, kind, batch):
+        handler = self._handlers.get(kind)
+        retry_keys = {key for key, _, _ in batch}
+        try:
+            if handler is None:
+                raise LookupError(f"no handler registered for {kind!r}")
+            returned = await handler([(key, data) for key, data, _ in batch])
+            retry_keys = {key for key, _ in returned or ()}
+        except asyncio.CancelledError:
+            # Stopped mid-batch: the entries are still on disk and load again on the next start
+            raise
+        except Exception as e:
+            log_pipeline.emit(
+                f"{len(batch)} {kind} timers failed, retrying in {self.RETRY_DELAY:.0f} s: {str(e)}",
+                level="error", controller="scheduler",
+            )
+        retry_at = time.time() + self.RETRY_DELAY
+        for key, data, guild in batch:
+            if key in self._timers:
+                continue  # rescheduled by the handler in the meantime
+            if key in retry_keys:
+                self.schedule(key, kind, retry_at, data, guild=guild)
+            else:
+                self._store(guild).delete(key)
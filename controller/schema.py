@@ -0,0 +1,80 @@
+import copy
+
+
+class Setting:
+    """Declarative description of one controller setting: type, default, bounds and unit."""
+    def __init__(self, type, default, min=None, max=None, unit=None, label=None):
+        self.type = type
+        self.default = default
+        self.min = min
+        self.max = max
+        self.unit = unit
+        self.label = label
+
+    def coerce(self, value):
+        """Convert a raw value (e.g. text typed in the GUI) to the declared type, or raise ValueError."""
+        if self.type is bool:
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text in ("1", "true", "yes", "on"):
+                return True
+            if text in ("0", "false", "no", "off"):
+                return False
+            raise ValueError(f"expected yes/no, got {value!r}")
+
+        if self.type in (int, float):
+            if isinstance(value, bool):
+                raise ValueError(f"expected a number, got {value!r}")
+            try:
+                number = self.type(str(value).strip()) if isinstance(value, str) else self.type(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"expected {'an integer' if self.type is int else 'a number'}, got {value!r}")
+            if self.min is not None and number < self.min:
+                raise ValueError(f"must be at least {self.min}")
+            if self.max is not None and number > self.max:
+                raise ValueError(f"must be at most {self.max}")
+            return number
+
+        if self.type is str:
+            return str(value)
+
+        if isinstance(value, self.type):
+            return value
+        raise ValueError(f"expected {self.type.__name__}, got {type(value).__name__}")
+
+    def display_label(self, key):
+        """Return the GUI label for this setting."""
+        return self.label or key.replace("_", " ").capitalize()
+
+
+def schema_defaults(schema):
+    """Return {key: default} for a schema, copying mutable defaults."""
+    return {key: copy.deepcopy(setting.default) for key, setting in schema.items()}
+
+
+def get_schema(cls):
+    """Return a class's SETTINGS schema, inferring one from get_default_settings() for older controllers."""
+    schema = getattr(cls, "SETTINGS", None)
+    if schema is not None:
+        return schema
+    get_defaults = getattr(cls, "get_default_settings", None)
+    if get_defaults is None:
+        return {}
+    return {key: Setting(type(value), value) for key, value in get_defaults().items()}
+
+
+def validate_settings(schema, values, log_message=None):
+    """Return the entries of `values` converted to their declared types; invalid ones are dropped."""
+    result = {}
+    for key, value in values.items():
+        setting = schema.get(key)
+        if setting is None:
+            result[key] = value
+            continue
+        try:
+            result[key] = setting.coerce(value)
+        except ValueError as e:
+            if log_message:
+                log_message(f"Ignoring invalid {key}={value!r}: {e}", level="warning")
+    return result
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from controller.log_pipeline import log_pipeline
+from controller.settings_store import settings_store
+
+
+class SettingsBus:
+    """In-process publish/subscribe channel that pushes settings diffs to their owners."""
+    def __init__(self, store=settings_store):
+        self.store = store
+        self._subscribers = {}  # section -> [(callback(diff), loop it was subscribed from)]
+        self._lock = threading.Lock()
+
+    def subscribe(self, section, callback):
+        """Call callback(diff) whenever keys of `section` (e.g. "ControllerPing") change.
+
+        Subscribers made inside a running event loop are called on that loop, so a bot running
+        on its own thread receives diffs on its own thread.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with self._lock:
+            self._subscribers.setdefault(section, []).append((callback, loop))
+
+    def unsubscribe(self, section, callback):
+        """Stop delivering diffs for `section` to callback."""
+        with self._lock:
+            callbacks = [entry for entry in self._subscribers.get(section, []) if entry[0] != callback]
+            if callbacks:
+                self._subscribers[section] = callbacks
+            else:
+                self._subscribers.pop(section, None)
+
+    def publish(self, section, diff, persist=True):
+        """Deliver the keys of `diff` that actually changed and queue them for a background write.
+
+        With persist=False (another process owns settings.json) the diff is delivered as is.
+        """
+        if persist:
+            current = self.store.get(section)
+            changed = {key: value for key, value in diff.items() if current.get(key) != value}
+            if not changed:
+                return {}
+            self.store.update(section, changed)
+        else:
+            changed = dict(diff)
+        with self._lock:
+            callbacks = list(self._subscribers.get(section, []))
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for callback, loop in callbacks:
+            if loop is None or loop is current_loop:
+                self._deliver(section, callback, dict(changed))
+                continue
+            try:
+                loop.call_soon_threadsafe(self._deliver, section, callback, dict(changed))
+            except RuntimeError:
+                pass  # the subscriber's loop has already closed
+        return changed
+
+    @staticmethod
+    def _deliver(section, callback, diff):
+        try:
+            callback(diff)
+        except Exception as e:
+            log_pipeline.emit(f"Error applying settings to {section}: {str(e)}", level="error", controller=section)
+
+
+settings_bus = SettingsBus()
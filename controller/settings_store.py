@@ -0,0 +1,137 @@
+import atexit
+import copy
+import json
+import os
+import tempfile
+import threading
+
+
+class SettingsStore:
+    """In-memory view of settings.json with debounced, atomic write-behind."""
+    def __init__(self, path="settings.json", delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.on_error = None
+        self._data = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        atexit.register(self._write_safe)
+
+    def _ensure_loaded(self):
+        """Read the file once; later reads are served from memory."""
+        if self._data is None:
+            self._data = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+
+    def exists(self):
+        """Return True if the settings file is on disk."""
+        return os.path.exists(self.path)
+
+    def reload(self):
+        """Drop the in-memory copy and read the file again."""
+        with self._lock:
+            self._data = None
+            self._ensure_loaded()
+
+    def get(self, section, default=None):
+        """Return a copy of one section (e.g. "ControllerPing")."""
+        with self._lock:
+            self._ensure_loaded()
+            if section not in self._data:
+                return copy.deepcopy(default) if default is not None else {}
+            return copy.deepcopy(self._data[section])
+
+    def get_all(self):
+        """Return a copy of every section."""
+        with self._lock:
+            self._ensure_loaded()
+            return copy.deepcopy(self._data)
+
+    def set(self, section, values):
+        """Replace one section and schedule a write."""
+        with self._lock:
+            self._ensure_loaded()
+            new_values = copy.deepcopy(dict(values))
+            if self._data.get(section) == new_values:
+                return
+            self._data[section] = new_values
+            self._mark_dirty()
+
+    def update(self, section, diff):
+        """Merge a diff into one section and schedule a write."""
+        with self._lock:
+            self._ensure_loaded()
+            current = self._data.setdefault(section, {})
+            changed = {k: v for k, v in diff.items() if current.get(k) != v}
+            if not changed:
+                return
+            current.update(copy.deepcopy(changed))
+            self._mark_dirty()
+
+    def delete(self, section):
+        """Remove one section and schedule a write."""
+        with self._lock:
+            self._ensure_loaded()
+            if section not in self._data:
+                return
+            del self._data[section]
+            self._mark_dirty()
+
+    def replace(self, data):
+        """Replace every section and schedule a write."""
+        with self._lock:
+            self._ensure_loaded()
+            new_data = copy.deepcopy(dict(data))
+            if self._data == new_data:
+                return
+            self._data = new_data
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        """Flag pending changes and (re)start the debounce timer."""
+        self._dirty = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.delay, self._write_safe)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _write_safe(self):
+        """Timer callback: write and report errors instead of raising."""
+        try:
+            self.flush()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+
+    def flush(self):
+        """Write pending changes now (atomic temp file + rename)."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                snapshot = json.dumps(self._data, indent=4, ensure_ascii=False)
+                self._dirty = False
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(snapshot)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+settings_store = SettingsStore()
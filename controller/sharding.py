@@ -0,0 +1,215 @@
+"""Sharded mode: worker processes each run ControllerBot on a subset of shards, supervised over queues."""
+import asyncio
+import math
+import multiprocessing
+import queue
+import time
+from controller.log_pipeline import log_pipeline
+
+
+def run_shard_worker(token, shard_ids, shard_count, events, control):
+    """Process entry point: run one ControllerBot per shard id until told to stop."""
+    asyncio.run(_worker_main(token, shard_ids, shard_count, events, control))
+
+
+async def _worker_main(token, shard_ids, shard_count, events, control):
+    from controller.bot import ControllerBot
+    from controller.settings_bus import settings_bus
+
+    # Records are already redacted here; the supervisor re-emits them in the launcher's pipeline
+    log_pipeline.subscribe(lambda record: events.put(("log", record)))
+    stop = asyncio.Event()
+    bots = {}
+    for shard_id in shard_ids:
+        bots[shard_id] = ControllerBot(token, shard_id=shard_id, shard_count=shard_count)
+        events.put(("stats", shard_id, {"status": "connecting"}))
+
+    async def read_control():
+        while not stop.is_set():
+            try:
+                message = await asyncio.to_thread(control.get, True, 0.5)
+            except queue.Empty:
+                continue
+            if message[0] == "stop":
+                stop.set()
+            elif message[0] == "settings":
+                # The launcher already wrote settings.json; only deliver the diff here
+                settings_bus.publish(message[1], message[2], persist=False)
+
+    async def report_stats(interval=1.0):
+        counts = {shard_id: 0 for shard_id in bots}
+        while not stop.is_set():
+            await asyncio.sleep(interval)
+            for shard_id, bot in bots.items():
+                events_seen = bot.event_count
+                latency = bot.latency * 1000 if math.isfinite(bot.latency) else None
+                events.put(("stats", shard_id, {
+                    "status": "ready" if bot.is_ready() else "connecting",
+                    "latency_ms": latency,
+                    "events_per_sec": (events_seen - counts[shard_id]) / interval,
+                    "guilds": len(bot.guilds),
+                }))
+                counts[shard_id] = events_seen
+
+    tasks = [asyncio.create_task(bot.start(token)) for bot in bots.values()]
+    helpers = [asyncio.create_task(read_control()), asyncio.create_task(report_stats())]
+    stop_task = asyncio.create_task(stop.wait())
+    await asyncio.wait([*tasks, stop_task], return_when=asyncio.FIRST_COMPLETED)
+    stop.set()
+    for task in tasks:
+        if not task.done():
+            # Cancel instead of awaiting: after close() py-cord's reconnect loop fails on the closed session
+            task.cancel()
+        elif not task.cancelled() and task.exception() is not None:
+            log_pipeline.emit(f"Shard stopped with error: {str(task.exception())}", level="error", controller="sharding")
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for bot in bots.values():
+        if not bot.is_closed():
+            await bot.close()
+    for task in helpers:
+        task.cancel()
+    for shard_id in bots:
+        events.put(("stats", shard_id, {"status": "stopped"}))
+
+
+class ShardSupervisor:
+    """Starts, stops and restarts shard worker processes and aggregates what they report."""
+    STOP_TIMEOUT = 15.0
+
+    def __init__(self, token, shard_count, shards_per_process=1):
+        self.token = token
+        self.shard_count = shard_count
+        # spawn: forking a process that holds an SDL window and running threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self.events = self._context.Queue()
+        shard_ids = list(range(shard_count))
+        self.workers = [
+            {"shard_ids": shard_ids[i:i + shards_per_process], "process": None, "control": None,
+             "wanted": "stopped", "stop_sent": None}
+            for i in range(0, shard_count, shards_per_process)
+        ]
+        self.stats = {shard_id: {"status": "stopped"} for shard_id in shard_ids}
+        self.version = 0
+
+    def worker_for(self, shard_id):
+        """Return the index of the worker process that runs a shard."""
+        for index, worker in enumerate(self.workers):
+            if shard_id in worker["shard_ids"]:
+                return index
+        return None
+
+    def start(self):
+        for index in range(len(self.workers)):
+            self.start_worker(index)
+
+    def stop(self):
+        for index in range(len(self.workers)):
+            self.stop_worker(index)
+
+    def start_worker(self, index):
+        worker = self.workers[index]
+        if worker["process"] is not None and worker["process"].is_alive():
+            return
+        worker["control"] = self._context.Queue()
+        worker["process"] = self._context.Process(
+            target=run_shard_worker,
+            args=(self.token, worker["shard_ids"], self.shard_count, self.events, worker["control"]),
+            name=f"shard-worker-{index}",
+            daemon=True,
+        )
+        worker["process"].start()
+        worker["wanted"] = "running"
+        worker["stop_sent"] = None
+        self._set_status(worker, "starting")
+        log_pipeline.emit(f"Started shard worker {index} (shards {worker['shard_ids']})", controller="sharding")
+
+    def stop_worker(self, index, restart=False):
+        """Ask a worker to close its bots; poll() starts it again if `restart` is set."""
+        worker = self.workers[index]
+        worker["wanted"] = "restart" if restart else "stopped"
+        if worker["process"] is None or not worker["process"].is_alive():
+            if restart:
+                self.start_worker(index)
+            return
+        if worker["stop_sent"] is None:
+            worker["control"].put(("stop",))
+            worker["stop_sent"] = time.monotonic()
+            self._set_status(worker, "stopping")
+
+    def restart_worker(self, index):
+        self.stop_worker(index, restart=True)
+
+    def publish_settings(self, section, diff):
+        """Forward a settings diff to every running worker."""
+        for worker in self.workers:
+            if worker["process"] is not None and worker["process"].is_alive():
+                worker["control"].put(("settings", section, diff))
+
+    def is_running(self):
+        return any(w["process"] is not None and w["process"].is_alive() for w in self.workers)
+
+    def join(self, timeout=None):
+        deadline = time.monotonic() + (timeout or 0)
+        for worker in self.workers:
+            if worker["process"] is not None:
+                worker["process"].join(max(0, deadline - time.monotonic()) if timeout is not None else None)
+                if worker["process"].is_alive():
+                    worker["process"].terminate()
+
+    def totals(self):
+        """Aggregate latency (mean over ready shards) and event rate (sum) across shards."""
+        latencies = [s["latency_ms"] for s in self.stats.values() if s.get("latency_ms") is not None]
+        return {
+            "latency_ms": sum(latencies) / len(latencies) if latencies else None,
+            "events_per_sec": sum(s.get("events_per_sec", 0) for s in self.stats.values()),
+            "guilds": sum(s.get("guilds", 0) for s in self.stats.values()),
+        }
+
+    def _set_status(self, worker, status):
+        for shard_id in worker["shard_ids"]:
+            self.stats[shard_id] = {"status": status}
+        self.version += 1
+
+    def poll(self):
+        """Drain worker messages and handle exits; returns True if anything changed."""
+        changed = False
+        while True:
+            try:
+                message = self.events.get_nowait()
+            except queue.Empty:
+                break
+            except (EOFError, OSError):
+                break
+            if message[0] == "log":
+                record = dict(message[1])
+                record.pop("ts", None)
+                log_pipeline.emit(record.pop("message"), level=record.pop("level", "info"), **record)
+            elif message[0] == "stats":
+                self.stats[message[1]] = message[2]
+                changed = True
+
+        for index, worker in enumerate(self.workers):
+            process = worker["process"]
+            if process is None:
+                continue
+            if process.is_alive():
+                if worker["stop_sent"] is not None and time.monotonic() - worker["stop_sent"] > self.STOP_TIMEOUT:
+                    process.terminate()
+                continue
+            worker["process"] = None
+            worker["stop_sent"] = None
+            if worker["wanted"] == "restart":
+                self.start_worker(index)
+            elif worker["wanted"] == "running":
+                log_pipeline.emit(
+                    f"Shard worker {index} exited unexpectedly (code {process.exitcode})",
+                    level="error", controller="sharding",
+                )
+                self._set_status(worker, "crashed")
+            else:
+                self._set_status(worker, "stopped")
+            changed = True
+
+        if changed:
+            self.version += 1
+        return changed
@@ -1,56 +1,178 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from datetime import timedelta
 from discord.ext import commands
 import discord
-import json
-import os
+from controller.settings_store import settings_store
+from controller.bulk import BulkExecutor, BulkResult, bulk_jobs, is_retryable
+from controller.schema import Setting, schema_defaults, validate_settings
+
+MEMBER_ID = re.compile(r"<@!?(\d{15,20})>|(\d{15,20})")
+
+
+class CachedMember(commands.Converter):
+    """Member converter that serves repeat id/mention lookups from ControllerAdmin's LRU.
+
+    Names always go through MemberConverter: they change and can match someone else later.
+    """
+    async def convert(self, ctx, argument):
+        admin = ctx.bot.get_controller("ControllerAdmin")
+        match = MEMBER_ID.fullmatch(argument)
+        if admin is None or ctx.guild is None or match is None:
+            return await commands.MemberConverter().convert(ctx, argument)
+        member_id = int(match.group(1) or match.group(2))
+        member = admin.cached_member(ctx.guild.id, member_id)
+        if member is None:
+            member = await commands.MemberConverter().convert(ctx, argument)
+            admin.remember_member(ctx.guild.id, member)
+        return member
+
+
+def parse_duration(text):
+    """Parse "90", "30m", "2h" or "1d" (bare numbers are minutes) into a timedelta, or None."""
+    match = re.fullmatch(r"(\d+)([mhd]?)", text.strip().lower())
+    if not match:
+        return None
+    unit = {"": "minutes", "m": "minutes", "h": "hours", "d": "days"}[match.group(2)]
+    return timedelta(**{unit: int(match.group(1))})
+
 
 class ControllerAdmin:
     """Controller for handling administrative commands."""
+    MEMBER_CACHE_SIZE = 2048
+    BULK_BAN_CHUNK = 200  # Discord's bulk-ban endpoint takes at most 200 users per request
+
+    SETTINGS = {
+        "ban_enabled": Setting(bool, True),
+        "kick_enabled": Setting(bool, True),
+        "mute_enabled": Setting(bool, True),
+        "default_ban_reason": Setting(str, "No reason provided"),
+        "default_mute_role": Setting(str, "Muted"),
+        "default_mute_duration": Setting(int, 60, min=0, max=40320, unit="min"),
+        "mass_action_limit": Setting(int, 500, min=1, max=5000, label="Max targets per massban/masskick"),
+    }
+
     def __init__(self, bot, register_commands=True, load_settings_flag=True):
         self.bot = bot
-        self.settings = {
-            "ban_enabled": True,
-            "kick_enabled": True,
-            "mute_enabled": True,
-            "default_ban_reason": "No reason provided",
-            "default_mute_role": "Muted",
-            "default_mute_duration": 60  
-        }
+        self.settings = schema_defaults(self.SETTINGS)
+        self._roles = {}  # guild id -> {role name: role}, kept current by the role listeners
+        self._members = OrderedDict()  # (guild id, member id) -> member, most recent last
+        self._setups = set()  # mute setup jobs a command is running (or about to run)
         if load_settings_flag:
             self.load_settings()
         if register_commands:
             self.register_commands()
-    @staticmethod
-    def get_default_settings():
-        return {
-            "ban_enabled": True,
-            "kick_enabled": True,
-            "mute_enabled": True,
-            "default_ban_reason": "No reason provided",
-            "default_mute_role": "Muted",
-            "default_mute_duration": 60
-        }
+            self.register_listeners()
+            self.bot.scheduler.register("unmute", self.expire_mutes)
+    @classmethod
+    def get_default_settings(cls):
+        return schema_defaults(cls.SETTINGS)
+
+    def teardown(self):
+        """Called on unload: stop receiving expired mutes (they wait for the next instance)."""
+        self.bot.scheduler.unregister("unmute", self.expire_mutes)
+
+    def get_role(self, guild, name):
+        """Return the guild's role with this name from the index, building the index on first use."""
+        roles = self._roles.get(guild.id)
+        if roles is None:
+            roles = {}
+            # guild.roles is ordered bottom-up; keep the first role for each name like discord.utils.get
+            for role in guild.roles:
+                roles.setdefault(role.name, role)
+            self._roles[guild.id] = roles
+        return roles.get(name)
+
+    def _index_role(self, role):
+        roles = self._roles.get(role.guild.id)
+        if roles is not None:
+            roles.setdefault(role.name, role)
+
+    def _unindex_role(self, role, name):
+        roles = self._roles.get(role.guild.id)
+        if roles is None or getattr(roles.get(name), "id", None) != role.id:
+            return
+        del roles[name]
+        # Another role may share the name (rare); fall back to it
+        other = discord.utils.find(lambda r: r.name == name and r.id != role.id, role.guild.roles)
+        if other is not None:
+            roles[name] = other
+
+    def cached_member(self, guild_id, member_id):
+        member = self._members.get((guild_id, member_id))
+        if member is not None:
+            self._members.move_to_end((guild_id, member_id))
+        return member
+
+    def remember_member(self, guild_id, member):
+        """Cache a resolved member under its id."""
+        key = (guild_id, member.id)
+        self._members[key] = member
+        self._members.move_to_end(key)
+        while len(self._members) > self.MEMBER_CACHE_SIZE:
+            self._members.popitem(last=False)
+
+    def forget_member(self, guild_id, member_id):
+        self._members.pop((guild_id, member_id), None)
+
+    def forget_guild(self, guild_id):
+        """Drop a guild's role index and cached members."""
+        self._roles.pop(guild_id, None)
+        for key in [key for key in self._members if key[0] == guild_id]:
+            del self._members[key]
+
+    def register_listeners(self):
+        """Keep the role index and member cache in step with gateway events."""
+        async def on_guild_role_create(role):
+            self._index_role(role)
+
+        async def on_guild_role_update(before, after):
+            if before.name != after.name:
+                self._unindex_role(after, before.name)
+                self._index_role(after)
+
+        async def on_guild_role_delete(role):
+            self._unindex_role(role, role.name)
+
+        async def on_member_remove(member):
+            self.forget_member(member.guild.id, member.id)
+
+        async def on_guild_remove(guild):
+            self.bot.scheduler.cancel_guild(guild.id)
+            self.forget_guild(guild.id)
+
+        async def on_guild_available(guild):
+            # Roles may have changed while the guild was unavailable
+            self.forget_guild(guild.id)
+
+        async def on_ready():
+            # After a new session nothing guarantees the indexes saw every change; rebuild lazily
+            self._roles.clear()
+            self._members.clear()
+
+        for listener in (on_guild_role_create, on_guild_role_update, on_guild_role_delete, on_member_remove,
+                         on_guild_remove, on_guild_available, on_ready):
+            self.bot.add_listener(listener)
 
     def load_settings(self):
         try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    data = json.load(f)
-                    self.settings.update(data.get("ControllerAdmin", {}))
+            stored = settings_store.get("ControllerAdmin")
+            self.settings.update(validate_settings(self.SETTINGS, stored, self.bot.log_message))
         except Exception as e:
-            self.bot.log_message(f"Error loading admin settings: {str(e)}")
+            self.bot.log_message(f"Error loading admin settings: {str(e)}", level="error", controller="ControllerAdmin")
 
     def save_settings(self):
         try:
-            data = {}
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    data = json.load(f)
-            data["ControllerAdmin"] = self.settings
-            with open("settings.json", "w") as f:
-                json.dump(data, f, indent=4)
-            self.bot.log_message("Admin settings saved")
+            settings_store.set("ControllerAdmin", self.settings)
         except Exception as e:
-            self.bot.log_message(f"Error saving admin settings: {str(e)}")
+            self.bot.log_message(f"Error saving admin settings: {str(e)}", level="error", controller="ControllerAdmin")
+
+    def on_settings_changed(self, diff):
+        """Re-register commands when one of the *_enabled flags flips."""
+        if any(key in diff for key in ("ban_enabled", "kick_enabled", "mute_enabled")):
+            self.bot.refresh_commands("ControllerAdmin")
 
     @staticmethod
     def is_admin():
@@ -62,47 +184,302 @@ class ControllerAdmin:
         if self.settings["ban_enabled"]:
             @self.bot.command(name="ban")
             @ControllerAdmin.is_admin()
-            async def ban(ctx, member: discord.Member, *, reason=None):
+            async def ban(ctx, member: CachedMember, *, reason=None):
                 try:
                     reason = reason or self.settings["default_ban_reason"]
                     await member.ban(reason=reason)
                     await ctx.send(f"🔨 {member.mention} has been banned. Reason: {reason}")
                 except Exception as e:
+                    self.bot.log_message(
+                        f"Failed to ban {member}: {e}", level="error",
+                        controller="ControllerAdmin", guild=ctx.guild.id, command="ban"
+                    )
                     await ctx.send(f"❌ Failed to ban: {e}")
 
+        if self.settings["ban_enabled"]:
+            @self.bot.command(name="massban")
+            @ControllerAdmin.is_admin()
+            async def massban(ctx, mode, *, query):
+                """!massban ids|joined|name <ids, window or regex> [| reason]"""
+                query, _, reason = query.partition("|")
+                reason = reason.strip() or self.settings["default_ban_reason"]
+                targets, error = self.select_targets(ctx, mode, query)
+                if error:
+                    return await ctx.send(f"❌ {error}")
+                status = await ctx.send(f"⏳ Banning {len(targets)} accounts...")
+                result = await self.ban_many(ctx.guild, targets, reason, self._progress_reporter(status, "Banning"))
+                await self._finish_mass_action(ctx, status, result, "Banned", "massban")
+
+        if self.settings["kick_enabled"]:
+            @self.bot.command(name="masskick")
+            @ControllerAdmin.is_admin()
+            async def masskick(ctx, mode, *, query):
+                """!masskick ids|joined|name <ids, window or regex> [| reason]"""
+                query, _, reason = query.partition("|")
+                reason = reason.strip() or None
+                targets, error = self.select_targets(ctx, mode, query)
+                if error:
+                    return await ctx.send(f"❌ {error}")
+                status = await ctx.send(f"⏳ Kicking {len(targets)} members...")
+
+                async def kick_one(target):
+                    await ctx.guild.kick(target, reason=reason)
+
+                executor = BulkExecutor(progress=self._progress_reporter(status, "Kicking"))
+                result = await executor.run(targets, kick_one, key=lambda m: m.id)
+                await self._finish_mass_action(ctx, status, result, "Kicked", "masskick")
+
         if self.settings["kick_enabled"]:
             @self.bot.command(name="kick")
             @ControllerAdmin.is_admin()
-            async def kick(ctx, member: discord.Member, *, reason):
+            async def kick(ctx, member: CachedMember, *, reason):
                 try:
                     await member.kick(reason=reason)
                     await ctx.send(f"👢 {member.mention} has been kicked. Reason: {reason}")
                 except Exception as e:
+                    self.bot.log_message(
+                        f"Failed to kick {member}: {e}", level="error",
+                        controller="ControllerAdmin", guild=ctx.guild.id, command="kick"
+                    )
                     await ctx.send(f"❌ Failed to kick: {e}")
 
         if self.settings["mute_enabled"]:
             @self.bot.command(name="mute")
             @ControllerAdmin.is_admin()
-            async def mute(ctx, member: discord.Member, *, reason=None):
+            async def mute(ctx, member: CachedMember, *, reason=None):
                 guild = ctx.guild
-                muted_role = discord.utils.get(guild.roles, name=self.settings["default_mute_role"])
+                muted_role = self.get_role(guild, self.settings["default_mute_role"])
 
+                needs_setup = False
                 if not muted_role:
                     try:
                         muted_role = await guild.create_role(name=self.settings["default_mute_role"])
-                        for channel in guild.channels:
-                            await channel.set_permissions(
-                                muted_role,
-                                send_messages=False,
-                                speak=False,
-                                read_messages=True,
-                                read_message_history=True
-                            )
+                        # Index it now: mutes handled before GUILD_ROLE_CREATE arrives would create another one
+                        self._index_role(muted_role)
+                        needs_setup = True
                     except Exception as e:
+                        self.bot.log_message(
+                            f"Failed to create Muted role: {e}", level="error",
+                            controller="ControllerAdmin", guild=guild.id, command="mute"
+                        )
                         return await ctx.send(f"❌ Failed to create Muted role: {e}")
+                elif bulk_jobs.get(guild.id, self.mute_setup_job(guild, muted_role)):
+                    needs_setup = True  # an earlier setup was interrupted; resume it
+
+                job = self.mute_setup_job(guild, muted_role)
+                if job in self._setups:
+                    needs_setup = False  # another mute is setting the role up right now
+                elif needs_setup:
+                    self._setups.add(job)  # claim it before awaiting so concurrent mutes skip it
 
                 try:
-                    await member.add_roles(muted_role, reason=reason or self.settings["default_ban_reason"])
-                    await ctx.send(f"🔇 {member.mention} has been muted for {self.settings['default_mute_duration']} minutes. Reason: {reason}")
-                except Exception as e:
-                    await ctx.send(f"❌ Failed to mute: {e}")
\ No newline at end of file
+                    try:
+                        await member.add_roles(muted_role, reason=reason or self.settings["default_ban_reason"])
+                        duration = self.settings["default_mute_duration"]
+                        if duration:
+                            self.schedule_unmute(guild, member, muted_role, duration * 60)
+                            await ctx.send(f"🔇 {member.mention} has been muted for {duration} minutes. Reason: {reason}")
+                        else:
+                            await ctx.send(f"🔇 {member.mention} has been muted until unmuted by hand. Reason: {reason}")
+                    except Exception as e:
+                        self.bot.log_message(
+                            f"Failed to mute {member}: {e}", level="error",
+                            controller="ControllerAdmin", guild=ctx.guild.id, command="mute"
+                        )
+                        await ctx.send(f"❌ Failed to mute: {e}")
+
+                    if needs_setup:
+                        await self.setup_mute_role(ctx, muted_role)
+                finally:
+                    if needs_setup:
+                        self._setups.discard(job)
+
+    def select_targets(self, ctx, mode, query):
+        """Resolve a mass-action query to targets; returns (targets, error message or None).
+
+        `ids` accepts ids or mentions, including accounts that are not cached (or already left, for bans),
+        `joined 2h` or `joined 2h 1h` selects members who joined inside that window and
+        `name <regex>` matches usernames and display names. Only cached members are
+        searched by `joined` and `name`, so they need the members intent to see everyone.
+        """
+        guild = ctx.guild
+        query = query.strip()
+        mode = mode.lower()
+        if mode == "ids":
+            ids = dict.fromkeys(int(i) for i in re.findall(r"\d{15,20}", query))
+            targets = [guild.get_member(i) or discord.Object(id=i) for i in ids]
+        elif mode == "joined":
+            bounds = [parse_duration(part) for part in query.split()]
+            if not 1 <= len(bounds) <= 2 or None in bounds:
+                return [], "Usage: joined <since> [<until>], e.g. `joined 2h` or `joined 2h 30m`"
+            now = discord.utils.utcnow()
+            since = now - bounds[0]
+            until = now - bounds[1] if len(bounds) == 2 else now
+            targets = [m for m in guild.members if m.joined_at and since <= m.joined_at <= until]
+        elif mode == "name":
+            if not query or len(query) > 200:
+                return [], "Usage: name <regex> (up to 200 characters)"
+            try:
+                pattern = re.compile(query, re.IGNORECASE)
+            except re.error as e:
+                return [], f"Invalid regex: {e}"
+            targets = [m for m in guild.members if pattern.search(m.name) or pattern.search(m.display_name)]
+        else:
+            return [], "Mode must be `ids`, `joined` or `name`"
+
+        protected = {ctx.author.id, guild.owner_id, self.bot.user.id if self.bot.user else None}
+        targets = [t for t in targets if t.id not in protected]
+        if not targets:
+            return [], "No matching accounts"
+        if len(targets) > self.settings["mass_action_limit"]:
+            return [], (f"{len(targets)} accounts match, more than mass_action_limit "
+                        f"({self.settings['mass_action_limit']}); narrow the query")
+        return targets, None
+
+    async def ban_many(self, guild, targets, reason, progress=None):
+        """Ban through the bulk-ban endpoint in chunks, falling back to concurrent single bans."""
+        result = BulkResult(len(targets))
+        remaining = list(targets)
+        while remaining and hasattr(guild, "bulk_ban"):
+            chunk = remaining[:self.BULK_BAN_CHUNK]
+            try:
+                banned, failed = await self._bulk_ban_chunk(guild, chunk, reason)
+            except discord.Forbidden:
+                break  # bulk-ban also needs Manage Server; ban one by one instead
+            except Exception as e:
+                # Discord rejects the whole request when none of the users could be banned
+                result.failed.update({t.id: f"{type(e).__name__}: {e}" for t in chunk})
+            else:
+                banned_ids = {u.id for u in banned}
+                result.done.extend(banned_ids)
+                result.failed.update({t.id: "not banned" for t in chunk if t.id not in banned_ids})
+            del remaining[:len(chunk)]
+            if progress:
+                try:
+                    await progress(result)
+                except Exception:
+                    pass  # progress is best effort, as in BulkExecutor
+        if remaining:
+            async def ban_one(target):
+                await guild.ban(target, reason=reason)
+
+            async def fallback_progress(partial):
+                # Report the whole command, not just the fallback part
+                combined = BulkResult(result.total)
+                combined.done = result.done + partial.done
+                combined.failed = {**result.failed, **partial.failed}
+                await progress(combined)
+
+            executor = BulkExecutor(progress=fallback_progress if progress else None)
+            fallback = await executor.run(remaining, ban_one, key=lambda t: t.id)
+            result.done.extend(fallback.done)
+            result.failed.update(fallback.failed)
+        return result
+
+    @staticmethod
+    async def _bulk_ban_chunk(guild, chunk, reason, retries=3, backoff=1.0):
+        """One bulk-ban request, retried on server errors and rate limits like BulkExecutor items."""
+        for retry in range(retries + 1):
+            try:
+                return await guild.bulk_ban(*chunk, reason=reason)
+            except Exception as e:
+                if retry == retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(backoff * 2 ** retry)
+
+    @staticmethod
+    def _progress_reporter(status, verb):
+        async def progress(result):
+            await status.edit(content=f"⏳ {verb}: {result.summary()}")
+        return progress
+
+    async def _finish_mass_action(self, ctx, status, result, verb, command):
+        if result.failed:
+            self.bot.log_message(
+                f"{command} failed for {len(result.failed)} of {result.total}: {next(iter(result.failed.values()))}",
+                level="error", controller="ControllerAdmin", guild=ctx.guild.id, command=command
+            )
+            await status.edit(content=f"⚠️ {verb} {len(result.done)}/{result.total}; "
+                                      f"{len(result.failed)} failed ({next(iter(result.failed.values()))})")
+        else:
+            await status.edit(content=f"✅ {verb} {len(result.done)} accounts")
+
+    def schedule_unmute(self, guild, member, role, seconds):
+        """Queue the mute role's removal; muting the same member again moves the deadline."""
+        self.bot.scheduler.schedule(
+            f"unmute:{guild.id}:{member.id}", "unmute", time.time() + seconds,
+            {"guild": guild.id, "member": member.id, "role": role.id}, guild=guild.id,
+        )
+
+    async def expire_mutes(self, batch):
+        """Scheduler handler: remove the mute role for every expired mute, one concurrent run per guild.
+
+        Returns the timers of guilds that are not in the cache right now (e.g. during an
+        outage) so the scheduler tries them again; leaving a guild cancels its timers.
+        """
+        by_guild = {}
+        for key, data in batch:
+            by_guild.setdefault(data["guild"], []).append((key, data))
+        retry = []
+        for guild_id, entries in by_guild.items():
+            if self.bot.get_guild(guild_id) is None:
+                self.bot.log_message(
+                    f"Guild unavailable, retrying {len(entries)} expired mutes later", level="warning",
+                    controller="ControllerAdmin", guild=guild_id, command="mute"
+                )
+                retry.extend(entries)
+                continue
+            mutes = [data for _, data in entries]
+
+            async def unmute(mute):
+                # Raw route: the member does not have to be in the cache
+                await self.bot.http.remove_role(guild_id, mute["member"], mute["role"], reason="Mute expired")
+
+            result = await BulkExecutor().run(mutes, unmute, key=lambda m: m["member"])
+            if result.failed:
+                self.bot.log_message(
+                    f"Failed to unmute {len(result.failed)} of {result.total}: {next(iter(result.failed.values()))}",
+                    level="error", controller="ControllerAdmin", guild=guild_id, command="mute"
+                )
+            else:
+                self.bot.log_message(
+                    f"Unmuted {result.total} members", controller="ControllerAdmin", guild=guild_id, command="mute"
+                )
+        return retry
+
+    @staticmethod
+    def mute_setup_job(guild, role):
+        return f"mute_role:{guild.id}:{role.id}"
+
+    async def setup_mute_role(self, ctx, role):
+        """Deny sending and speaking for the mute role in every channel, concurrently and resumably."""
+        guild = ctx.guild
+        channels = list(guild.channels)
+        status = await ctx.send(f"⏳ Setting up {role.name} in {len(channels)} channels...")
+
+        async def progress(result):
+            await status.edit(content=f"⏳ Setting up {role.name}: {result.summary()}")
+
+        async def deny(channel):
+            await channel.set_permissions(
+                role,
+                send_messages=False,
+                speak=False,
+                read_messages=True,
+                read_message_history=True
+            )
+
+        executor = BulkExecutor(progress=progress)
+        # Permission overwrites are rate limited per channel, so every channel is its own bucket
+        result = await executor.run(
+            channels, deny, key=lambda c: c.id, bucket=lambda c: c.id, job=self.mute_setup_job(guild, role),
+            guild=guild.id,
+        )
+        if result.failed:
+            self.bot.log_message(
+                f"{role.name} setup failed in {len(result.failed)} channels: {next(iter(result.failed.values()))}",
+                level="error", controller="ControllerAdmin", guild=guild.id, command="mute"
+            )
+            await status.edit(content=f"⚠️ {role.name} set up with errors: {result.summary()}. Run the command again to retry.")
+        else:
+            await status.edit(content=f"✅ {role.name} set up in {result.total} channels")
@@ -1,48 +1,44 @@
 from discord.ext import commands
-import json
-import os
+from controller.settings_store import settings_store
+from controller.schema import Setting, schema_defaults, validate_settings
 
 class ControllerPing:
     """Controller for handling ping commands."""
+    BUFFER_REPLIES = True  # both responses go out as one message
+    SETTINGS = {
+        "enabled": Setting(bool, True),
+        "response": Setting(str, "Pong!"),
+        "response2": Setting(str, "Ping successful!"),
+    }
+
     def __init__(self, bot, register_commands=True, load_settings_flag=True):
         self.bot = bot
-        self.settings = {
-            "enabled": True,
-            "response": "Pong!",
-            "response2": "Ping successful!"}
+        self.settings = schema_defaults(self.SETTINGS)
         if load_settings_flag:
             self.load_settings()
         if register_commands:
             self.register_commands()
-    @staticmethod
-    def get_default_settings():
-        return {
-            "enabled": True,
-            "response": "Pong!",
-            "response2": "Ping successful!"
-        }
+    @classmethod
+    def get_default_settings(cls):
+        return schema_defaults(cls.SETTINGS)
 
     def load_settings(self):
         try:
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    data = json.load(f)
-                    self.settings.update(data.get("ControllerPing", {}))
+            stored = settings_store.get("ControllerPing")
+            self.settings.update(validate_settings(self.SETTINGS, stored, self.bot.log_message))
         except Exception as e:
-            self.bot.log_message(f"Error loading ping settings: {str(e)}")
+            self.bot.log_message(f"Error loading ping settings: {str(e)}", level="error", controller="ControllerPing")
 
     def save_settings(self):
         try:
-            data = {}
-            if os.path.exists("settings.json"):
-                with open("settings.json", "r") as f:
-                    data = json.load(f)
-            data["ControllerPing"] = self.settings
-            with open("settings.json", "w") as f:
-                json.dump(data, f, indent=4)
-            self.bot.log_message("Ping settings saved")
+            settings_store.set("ControllerPing", self.settings)
         except Exception as e:
-            self.bot.log_message(f"Error saving ping settings: {str(e)}")
+            self.bot.log_message(f"Error saving ping settings: {str(e)}", level="error", controller="ControllerPing")
+
+    def on_settings_changed(self, diff):
+        """Add or remove !ping when "enabled" flips."""
+        if "enabled" in diff:
+            self.bot.refresh_commands("ControllerPing")
 
     def register_commands(self):
         if not self.settings["enabled"]:
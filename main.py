@@ -1,21 +1,48 @@
+import time
+
+APP_START = time.perf_counter()
+
 import asyncio
 import platform
 import pygame
 import sys
-import pyperclip
 from pygame.locals import *
 from dotenv import load_dotenv, set_key
 import os
-import json
-from controller.bot import ControllerBot
+from controller.settings_store import settings_store
+from controller.settings_bus import settings_bus
+from controller.registry import registry
+from controller.log_pipeline import log_pipeline, LEVELS
+from controller.diagnostics import startup_report
+from controller.schema import get_schema, schema_defaults, validate_settings
 
-import importlib.util
-import inspect
 import copy
+import queue
+from collections import OrderedDict, deque
+
+# Startup phases (GUI_STARTUP_TIMING=1 prints them): the window shows its first
+# frame with fallback fonts; system fonts, controller discovery and default
+# settings are loaded in the background afterwards.
+STARTUP_TIMING = os.getenv("GUI_STARTUP_TIMING", "0") != "0"
+FIRST_FRAME_BUDGET_MS = 250
+startup_phases = []
+_phase_mark = [APP_START]
+
+def mark_phase(name):
+    """Record the time spent since the previous startup phase."""
+    now = time.perf_counter()
+    startup_phases.append((name, (now - _phase_mark[0]) * 1000, (now - APP_START) * 1000))
+    _phase_mark[0] = now
+
+def report_startup_phases():
+    """Print the startup phase breakdown when GUI_STARTUP_TIMING is set."""
+    if not STARTUP_TIMING:
+        return
+    print("Startup phases:")
+    for name, took, at in startup_phases:
+        print(f"  {name:<28} {took:8.1f} ms   (t={at:.1f} ms)")
 
-pygame.init()
-pygame.font.init()
-
+mark_phase("imports")
 
 THEME = "dark"
 
@@ -51,30 +78,154 @@ def toggle_theme():
     global THEME, COLORS
     THEME = "light" if THEME == "dark" else "dark"
     COLORS = get_theme_colors()
+    invalidate_layers()
 
 WIDTH, HEIGHT = 1000, 800
 MIN_WIDTH, MIN_HEIGHT = 700, 600
 FPS = 60
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
-pygame.display.set_caption("Discord Bot GUI (Auto Layout)")
+screen = None
+
+# Bounded LRU of rendered text surfaces keyed by (font, text, color, antialias),
+# plus a width cache; both are dropped whenever get_fonts() rebuilds the fonts.
+TEXT_CACHE_SIZE = 1024
+text_cache = OrderedDict()
+text_width_cache = {}
+
+def render_text(f, text, antialias, color):
+    """Cached drop-in for f.render(text, antialias, color)."""
+    key = (f, text, tuple(color), antialias)
+    surface = text_cache.get(key)
+    if surface is None:
+        surface = f.render(text, antialias, color)
+        text_cache[key] = surface
+        if len(text_cache) > TEXT_CACHE_SIZE:
+            text_cache.popitem(last=False)
+    else:
+        text_cache.move_to_end(key)
+    return surface
+
+def text_width(f, text):
+    """Return the rendered width of text, cached per font."""
+    key = (f, text)
+    width = text_width_cache.get(key)
+    if width is None:
+        if len(text_width_cache) > TEXT_CACHE_SIZE * 4:
+            text_width_cache.clear()
+        width = text_width_cache[key] = f.size(text)[0]
+    return width
+
+def truncate_to_width(f, text, max_width):
+    """Return the longest prefix of text that fits in max_width (binary search)."""
+    if text_width(f, text) <= max_width:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if f.size(text[:mid])[0] <= max_width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+system_fonts_ready = False
 
 def get_fonts():
     """Return the main fonts used in the application."""
+    text_cache.clear()
+    text_width_cache.clear()
+    if not system_fonts_ready:
+        # pygame's bundled font needs no system font scan; used until load_system_fonts() finishes
+        f = pygame.font.Font(None, max(22, HEIGHT // 28) + 6)
+        f.set_bold(True)
+        sf = pygame.font.Font(None, max(16, HEIGHT // 38) + 6)
+        ic = pygame.font.Font(None, max(28, HEIGHT // 24) + 6)
+        return f, sf, ic
     f = pygame.font.SysFont('Segoe UI', max(22, HEIGHT // 28), bold=True)
     sf = pygame.font.SysFont('Segoe UI', max(16, HEIGHT // 38))
     ic = pygame.font.SysFont('Segoe UI Symbol', max(28, HEIGHT // 24))
     return f, sf, ic
 
-font, small_font, icon_font = get_fonts()
+font = small_font = icon_font = None
+
+def init_display():
+    """Initialize pygame, open the window and create fallback fonts."""
+    global screen, font, small_font, icon_font
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("Discord Bot GUI (Auto Layout)")
+    font, small_font, icon_font = get_fonts()
+
+# Pre-rendered static layers (background, panel gradients, modal overlay).
+# Keyed on size and theme; cleared on VIDEORESIZE and toggle_theme.
+LAYER_CACHE_ENABLED = os.getenv("GUI_LAYER_CACHE", "1") != "0"
+layer_cache = {}
+
+def invalidate_layers():
+    """Drop all cached layers so they are rebuilt for the new size or theme."""
+    layer_cache.clear()
+
+def get_layer(key, build):
+    """Return a cached layer surface, building it on first use."""
+    surface = layer_cache.get(key)
+    if surface is None:
+        surface = build()
+        if LAYER_CACHE_ENABLED:
+            layer_cache[key] = surface
+    return surface
+
+# Redraw scheduling: input, logs, settings and bot state mark regions dirty;
+# only those regions are redrawn and pushed with pygame.display.update(rects).
+EVENT_REDRAW = os.getenv("GUI_EVENT_REDRAW", "1") != "0"
+IDLE_FPS = 5
+IDLE_AFTER_MS = 1500
+redraw = {"full": True, "regions": set(), "last_activity": 0}
+layout = {}
+
+def mark_dirty(region=None, activity=True):
+    """Schedule a redraw of one region ("header", "tabs", "settings", "console", "metrics") or of the whole window."""
+    if region is None or layout.get(region) is None:
+        redraw["full"] = True
+    else:
+        redraw["regions"].add(region)
+    if activity:
+        mark_activity()
+
+def mark_activity():
+    """Keep the loop at full frame rate for a while after user or bot activity."""
+    redraw["last_activity"] = pygame.time.get_ticks()
+
+def frame_delay():
+    """Return how long to sleep before the next frame, dropping to IDLE_FPS when idle."""
+    if EVENT_REDRAW and pygame.time.get_ticks() - redraw["last_activity"] > IDLE_AFTER_MS:
+        return 1.0 / IDLE_FPS
+    return 1.0 / FPS
 
 # Global variables
-logs = []
-filtered_logs = []
-max_logs = 6
+# Ring buffer of (seq, text, lowercase text); seq numbers only ever grow, so
+# evicted entries are simply those below the seq of logs[0].
+max_logs = max(1, int(os.getenv("GUI_MAX_LOGS", "20000")))
+CONSOLE_MIN_LEVEL = LEVELS.get(os.getenv("GUI_CONSOLE_LEVEL", "info"), 20)
+logs = deque(maxlen=max_logs)
+log_seq = 0
+# Entries matching the search text, narrowed incrementally as the query grows
+search = {"query": "", "version": 0, "matches": deque()}
+# Wrapped console lines for the current width, font and search
+console_layout = {"key": None, "last_seq": 0, "entries": deque(), "lines": [], "offset": 0, "wraps": {}}
 show_console = True
 bot = None
 bot_task = None
 bot_running = False
+# GUI_BOT_MODE=thread (default) runs the bot on its own thread and event loop; "inline" shares the GUI loop
+BOT_MODE = os.getenv("GUI_BOT_MODE", "thread")
+bot_runner = None
+# Set instead of bot/bot_runner when ControllerBot's shard_count > 0: worker processes run the shards
+shard_supervisor = None
+shard_buttons = []  # (rect, action, worker index) in the metrics panel
+# GUI_RENDER_LOAD_MS=N burns N ms per frame to check that a slow GUI does not delay the bot
+RENDER_LOAD_MS = float(os.getenv("GUI_RENDER_LOAD_MS", "0") or 0)
+# Log records can come from the bot thread and the settings writer; they are applied on the GUI thread
+console_inbox = queue.SimpleQueue()
 settings_scroll = 0
 settings_view_rect = None
 console_scroll = 0
@@ -91,81 +242,69 @@ settings_scroll_max = 0
 settings_content_h = 0
 
 def get_all_controller_classes(modals_dir=None):
-    """Dynamically load all controller classes from the specified directory."""
-    if getattr(sys, 'frozen', False):
-        base_path = sys._MEIPASS
-        modals_dir = os.path.join(base_path, "controller", "modals")
-    else:
-        modals_dir = modals_dir or os.path.join("controller", "modals")
-
-    controller_classes = {}
-
-    if not os.path.exists(modals_dir):
-        return controller_classes
+    """Return all controller classes, imported once through the shared registry."""
+    return registry.get_classes(modals_dir, lambda message: log_pipeline.emit(f"❌ {message}", level="error", controller="GUI"))
 
-    for filename in os.listdir(modals_dir):
-        if filename.startswith("controller_") and filename.endswith(".py"):
-            module_path = os.path.join(modals_dir, filename)
-            module_name = filename[:-3]
-
-            try:
-                spec = importlib.util.spec_from_file_location(module_name, module_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-
-                for name, obj in inspect.getmembers(module, inspect.isclass):
-                    if name.startswith("Controller"):
-                        controller_classes[name] = obj
-            except Exception as e:
-                print(f"❌ Error loading controller {filename}: {e}")
-
-    return controller_classes
-
-controller_classes = {
-
-}
-controller_classes.update(get_all_controller_classes())
-
-## Defaults & settings
+controller_classes = {}
 default_settings = {}
-for name, cls in controller_classes.items():
-    try:
-        temp_bot = type('TempBot', (), {'log_message': lambda x: None})()
-        if cls:
-            try:
-                controller_instance = cls(temp_bot, register_commands=False, load_settings_flag=False)
-                default_settings[name] = controller_instance.settings.copy()
-            except Exception as e:
-                print(f"❌ Failed to init {name}: {e}")
-        else:
-            print(f"⚠️ Controller class for {name} is None")
-    except Exception as e:
-        print(f"❌ Failed to init {name}: {e}")
+settings = {}
 
+schemas = {}
 
-default_settings["ControllerBot"] = {"default_prefix": "!"}
+def load_controller_defaults():
+    """Discover controllers and read their settings schemas (runs in a worker thread)."""
+    from controller.bot import ControllerBot
 
-settings = copy.deepcopy(default_settings)
-if os.path.exists("settings.json"):
-    try:
-        with open("settings.json", "r") as f:
-            loaded_settings = json.load(f)
-            for controller, defaults in default_settings.items():
+    classes = get_all_controller_classes()
+    found = registry.get_schemas()
+    found["ControllerBot"] = get_schema(ControllerBot)
+    return classes, found
+
+def apply_controller_defaults(classes, found):
+    """Install discovered controllers and merge settings.json, validated once, over their defaults."""
+    global settings
+    controller_classes.clear()
+    controller_classes.update(classes)
+    schemas.clear()
+    schemas.update(found)
+    default_settings.clear()
+    default_settings.update({name: schema_defaults(schema) for name, schema in schemas.items()})
+
+    merged = copy.deepcopy(default_settings)
+    if settings_store.exists():
+        try:
+            loaded_settings = settings_store.get_all()
+            for controller, schema in schemas.items():
                 controller_settings = loaded_settings.get(controller, {})
-                for key, default_value in defaults.items():
-                    current_value = controller_settings.get(key)
-                    settings[controller][key] = current_value if current_value not in ["", None] else default_value
+                stored = {k: v for k, v in controller_settings.items() if k in schema and v not in ["", None]}
+                merged[controller].update(validate_settings(schema, stored, log_message))
+        except Exception as e:
+            log_pipeline.emit(f"Error loading settings: {str(e)}", level="error", controller="GUI")
+    settings = merged
+
+    if not settings_store.exists():
+        settings_store.replace(settings)
+        settings_store.flush()
+        log_pipeline.emit("✅ settings.json created with default values.", controller="GUI")
+
+async def deferred_startup():
+    """Load system fonts and controller defaults after the first frame is on screen."""
+    global font, small_font, icon_font, system_fonts_ready
+    try:
+        await asyncio.to_thread(pygame.font.get_fonts)
+        system_fonts_ready = True
+        font, small_font, icon_font = get_fonts()
+        mark_phase("system fonts (background)")
+
+        classes, found = await asyncio.to_thread(load_controller_defaults)
+        mark_phase("controllers + bot import (bg)")
+        apply_controller_defaults(classes, found)
+        mark_phase("settings merge")
     except Exception as e:
-        print(f"Error loading settings: {str(e)}")
-if "ControllerBot" not in settings:
-    settings["ControllerBot"] = {"default_prefix": "!"}
-elif "default_prefix" not in settings["ControllerBot"]:
-    settings["ControllerBot"]["default_prefix"] = "!"
-
-if not os.path.exists("settings.json"):
-    with open("settings.json", "w") as f:
-        json.dump(settings, f, indent=4)
-        print("✅ settings.json created with default values.")
+        log_message(f"Error during startup: {str(e)}", level="error")
+    state["startup_done"] = True
+    mark_dirty()
+    report_startup_phases()
 
 state = {
     "token_text": "",
@@ -174,7 +313,9 @@ state = {
     "active_search": False,
     "active_tab": None,
     "hover_times": {},
-    "active_input": None
+    "active_input": None,
+    "active_target": None,
+    "input_buffer": ""
 }
 # UI elements
 start_button = None
@@ -183,29 +324,126 @@ toggle_button = None
 token_box = None
 search_box = None
 tab_buttons = []
-setting_elements = []
+setting_elements = {}  # (controller, key) -> hit rect of its widget
 reset_button = None
+profile_button = None  # per-controller cProfile toggle, or "Export" on the ControllerBot tab
 
 def sanitize_text(text):
     """Sanitize text by removing null characters and trimming whitespace."""
     return str(text).replace('\\x00', '').strip()
 
-def log_message(message):
-    """Log a message to the console and store it in the logs."""
-    global filtered_logs
-    sanitized = message.replace(state["token_text"], "[HIDDEN]") if state["token_text"] else message
-    logs.append(sanitized[:100])
-    if len(logs) > max_logs:
-        logs.pop(0)
-    update_filtered_logs()
+def log_message(message, level="info", **fields):
+    """Emit a GUI record to the shared log pipeline (the console subscribes to it)."""
+    fields.setdefault("controller", "GUI")
+    log_pipeline.emit(message, level=level, **fields)
+
+def append_console_record(record):
+    """Pipeline subscriber: store an (already redacted) record in the console ring buffer."""
+    global log_seq
+    if LEVELS.get(record["level"], 20) < CONSOLE_MIN_LEVEL:
+        return
+    text = record["message"]
+    log_seq += 1
+    entry = (log_seq, text, text.lower())
+    logs.append(entry)
+    if search["query"]:
+        matches = search["matches"]
+        first_seq = logs[0][0]
+        while matches and matches[0][0] < first_seq:
+            matches.popleft()
+        if search["query"] in entry[2]:
+            matches.append(entry)
+    mark_dirty("console")
+
+def queue_console_record(record):
+    """Pipeline subscriber: hand a record to the GUI thread."""
+    console_inbox.put(record)
+
+def drain_console_inbox():
+    """Apply queued log records to the console (GUI thread only)."""
+    while True:
+        try:
+            record = console_inbox.get_nowait()
+        except queue.Empty:
+            return
+        append_console_record(record)
+
+def run_on_bot(callback, *args):
+    """Call into the bot on the thread that runs it."""
+    if bot_runner is not None:
+        bot_runner.call(callback, *args)
+    else:
+        callback(*args)
+
+def poll_shards():
+    """Collect shard worker stats and logs; finish the stop once every worker has exited."""
+    global shard_supervisor, bot_running
+    if shard_supervisor is None:
+        return
+    shard_supervisor.poll()
+    if all(w["wanted"] == "stopped" for w in shard_supervisor.workers) and not shard_supervisor.is_running():
+        shard_supervisor = None
+        bot_running = False
+        log_message("Bot stopped.")
+        mark_dirty()
+
+def poll_bot_status():
+    """Apply status messages from the bot thread."""
+    global bot, bot_runner, bot_running
+    if bot_runner is None:
+        return
+    while True:
+        try:
+            kind, payload = bot_runner.status.get_nowait()
+        except queue.Empty:
+            return
+        if kind == "started":
+            bot = bot_runner.bot
+            log_message(f"Bot started. Loaded controllers: {payload}")
+            state["active_tab"] = payload[0] if payload else None
+        elif kind == "error":
+            log_message(f"Bot stopped with error: {payload}", level="error")
+        elif kind == "stopped":
+            bot = None
+            bot_runner = None
+            bot_running = False
+            state["active_tab"] = None
+            log_message("Bot stopped.")
+            mark_dirty()
+            return
+        mark_dirty()
 
 def update_filtered_logs():
     """Update the filtered logs based on the current search text."""
-    global filtered_logs
-    if state["search_text"]:
-        filtered_logs = [log for log in logs if state["search_text"].lower() in log.lower()]
+    query = state["search_text"].lower()
+    previous = search["query"]
+    if query == previous:
+        return
+    if not query:
+        matches = deque()
+    elif previous and previous in query:
+        # The query only grew: narrow the previous result set
+        matches = deque(e for e in search["matches"] if query in e[2])
     else:
-        filtered_logs = logs
+        matches = deque(e for e in logs if query in e[2])
+    search["query"] = query
+    search["matches"] = matches
+    search["version"] += 1
+
+def filtered_entries(after_seq=0):
+    """Return the (seq, text, lower) entries matching the search that are newer than after_seq."""
+    source = search["matches"] if search["query"] else logs
+    if not source or source[-1][0] <= after_seq:
+        return []
+    if source[0][0] > after_seq:
+        return list(source)
+    newer = []
+    for entry in reversed(source):
+        if entry[0] <= after_seq:
+            break
+        newer.append(entry)
+    newer.reverse()
+    return newer
 
 def load_token():
     """Load the Discord token from the .env file."""
@@ -214,7 +452,7 @@ def load_token():
     if token:
         log_message("✅ Token loaded from .env")
     else:
-        log_message("⚠️ No token found in .env")
+        log_message("⚠️ No token found in .env", level="warning")
     return token
 
 def save_token(token):
@@ -223,16 +461,65 @@ def save_token(token):
         set_key(".env", "DISCORD_TOKEN", token)
         log_message("💾 Token saved to .env")
     except Exception as e:
-        log_message(f"❌ Failed to save token: {str(e)}")
-
-def save_settings():
-    """Save the current settings to the settings.json file."""
+        log_message(f"❌ Failed to save token: {str(e)}", level="error")
+
+def setting_type(controller_name, key):
+    """Return the declared type of a setting (falling back to the type of its current value)."""
+    spec = schemas.get(controller_name, {}).get(key)
+    if spec is not None:
+        return spec.type
+    return type(settings.get(controller_name, {}).get(key))
+
+def apply_setting(controller_name, key, value):
+    """Store an already validated value and publish it to its owner on the settings bus."""
+    settings[controller_name][key] = value
+    # The running bot and controllers subscribe to their own sections; the file is written in the background
+    settings_bus.publish(controller_name, {key: value})
+    if shard_supervisor is not None:
+        shard_supervisor.publish_settings(controller_name, {key: value})
+    mark_dirty("settings")
+    log_message(f"Updated {key} to {value}")
+
+def begin_edit(controller_name, key):
+    """Start editing a text or number setting in a local buffer."""
+    if (controller_name, key) not in setting_elements:
+        return
+    state["active_input"] = key
+    state["active_target"] = controller_name
+    state["input_buffer"] = str(settings[controller_name].get(key, ""))
+
+def cancel_edit():
+    """Leave the active input without applying the buffer."""
+    state["active_input"] = None
+    state["active_target"] = None
+    state["input_buffer"] = ""
+    mark_dirty("settings")
+
+def commit_edit():
+    """Validate and convert the edit buffer once, then apply it."""
+    key, controller_name = state["active_input"], state["active_target"]
+    raw = state["input_buffer"]
+    cancel_edit()
+    if not key or controller_name not in settings:
+        return
+    spec = schemas.get(controller_name, {}).get(key)
     try:
-        with open("settings.json", "w") as f:
-            json.dump(settings, f, indent=4)
-        log_message("Settings saved to settings.json")
-    except Exception as e:
-        log_message(f"Error saving settings: {str(e)}")
+        value = spec.coerce(raw) if spec else raw
+    except ValueError as e:
+        log_message(f"Invalid value for {key}: {e}", level="warning")
+        return
+    if settings[controller_name].get(key) != value:
+        apply_setting(controller_name, key, value)
+
+def is_editing(controller_name, key):
+    """Return True if the given setting is the active input."""
+    return state["active_input"] == key and state["active_target"] == controller_name
+
+def setting_display_text(controller_name, key):
+    """Return the text shown in a setting's input box."""
+    if is_editing(controller_name, key):
+        return state["input_buffer"]
+    return str(settings[controller_name].get(key, ""))
 
 def reset_settings(controller_name=None):
     global settings
@@ -240,44 +527,44 @@ def reset_settings(controller_name=None):
     if controller_name is None:
         return 
 
+    cancel_edit()
     if controller_name in default_settings:
         settings[controller_name] = copy.deepcopy(default_settings[controller_name])
-        save_settings()
+        settings_bus.publish(controller_name, settings[controller_name])
+        if shard_supervisor is not None:
+            shard_supervisor.publish_settings(controller_name, settings[controller_name])
+        mark_dirty("settings")
         log_message(f"🔄 {controller_name} reset to defaults")
 
-        if bot_running and bot:
-            if controller_name == "ControllerBot":
-                bot.settings = copy.deepcopy(default_settings["ControllerBot"])
-            else:
-                controller = next((c for c in bot._controllers if type(c).__name__ == controller_name), None)
-                if controller:
-                    controller.settings = copy.deepcopy(default_settings[controller_name])
-                    controller.save_settings()
-
-
-    if bot_running and bot:
-
-        bot.load_settings()
-        for controller in bot._controllers:
-            controller.load_settings()
 
 
+def build_gradient_background(width, height):
+    """Render the window background gradient once."""
+    surface = pygame.Surface((width, height))
+    for y in range(height):
+        shade = 26 + y * 10 // max(1, height)
+        pygame.draw.line(surface, (shade, shade, shade), (0, y), (width, y))
+    return surface.convert()
 
 def draw_gradient_background():
     """Draw a gradient background."""
-    for y in range(HEIGHT):
-        shade = 26 + y * 10 // max(1, HEIGHT)
-        pygame.draw.line(screen, (shade, shade, shade), (0, y), (WIDTH, y))
+    background = get_layer(("background", WIDTH, HEIGHT, THEME), lambda: build_gradient_background(WIDTH, HEIGHT))
+    screen.blit(background, (0, 0))
 
-def draw_panel_mica(rect):
-    """Draw a Mica-like panel with a gradient effect."""
-    mica_surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+def build_panel_mica(width, height):
+    """Render the translucent Mica panel fill once."""
+    mica_surface = pygame.Surface((width, height), pygame.SRCALPHA)
     base_color = (32, 32, 37, 180)
     mica_surface.fill(base_color)
-    for y in range(rect.height):
-        shade = int(10 * (y / rect.height))
-        pygame.draw.line(mica_surface, (shade, shade, shade, 40), (0, y), (rect.width, y))
-    pygame.draw.rect(mica_surface, (255, 255, 255, 25), (0, 0, rect.width, rect.height // 6))
+    for y in range(height):
+        shade = int(10 * (y / height))
+        pygame.draw.line(mica_surface, (shade, shade, shade, 40), (0, y), (width, y))
+    pygame.draw.rect(mica_surface, (255, 255, 255, 25), (0, 0, width, height // 6))
+    return mica_surface.convert_alpha()
+
+def draw_panel_mica(rect):
+    """Draw a Mica-like panel with a gradient effect."""
+    mica_surface = get_layer(("panel", rect.width, rect.height, THEME), lambda: build_panel_mica(rect.width, rect.height))
     screen.blit(mica_surface, rect.topleft)
     pygame.draw.rect(screen, COLORS["TEXT"], rect, 2, border_radius=18)
 
@@ -292,10 +579,8 @@ def draw_text_input(rect, text, active, mask=False):
     if mask and not active:
         display_text = "*" * len(display_text)
     available_width = rect.width - 20
-    while font.size(display_text)[0] > available_width and len(display_text) > 0:
-        display_text = display_text[:-1]
-    display_text = display_text[:100]
-    clipped_surface = font.render(display_text, True, COLORS["TEXT"])
+    display_text = truncate_to_width(font, display_text[:100], available_width)
+    clipped_surface = render_text(font, display_text, True, COLORS["TEXT"])
     text_rect = clipped_surface.get_rect(midleft=(rect.x + 10, rect.centery))
     screen.blit(clipped_surface, text_rect)
 
@@ -304,13 +589,63 @@ def draw_checkbox(rect, checked, label):
     pygame.draw.rect(screen, (30, 30, 30), rect, border_radius=6)
     pygame.draw.rect(screen, COLORS["ACCENT_START"], rect, 2, border_radius=6)
     if checked:
-        check = icon_font.render('✔', True, COLORS["GREEN"])
+        check = render_text(icon_font, '✔', True, COLORS["GREEN"])
         check_rect = check.get_rect(center=rect.center)
         screen.blit(check, check_rect)
-    label_surface = small_font.render(label, True, COLORS["TEXT"])
+    label_surface = render_text(small_font, label, True, COLORS["TEXT"])
     screen.blit(label_surface, (rect.x + rect.width + 10, rect.y + 5))
 
 
+def wrap_text(f, text, max_width):
+    """Greedy word wrap; words wider than max_width are split across lines."""
+    lines = []
+    line = ""
+    for word in text.split(' '):
+        candidate = line + ' ' + word if line else word
+        if f.size(candidate)[0] <= max_width:
+            line = candidate
+            continue
+        if line:
+            lines.append(line)
+        while len(word) > 1 and f.size(word)[0] > max_width:
+            head = truncate_to_width(f, word, max_width) or word[0]
+            lines.append(head)
+            word = word[len(head):]
+        line = word
+    lines.append(line)
+    return lines
+
+def get_console_lines(max_width):
+    """Return (lines, offset) of wrapped console lines, wrapping only entries added since the last call."""
+    cache = console_layout
+    key = (small_font, max_width, search["version"])
+    if cache["key"] != key:
+        if cache["key"] is None or cache["key"][:2] != key[:2]:
+            cache["wraps"] = {}
+        cache.update(key=key, last_seq=0, entries=deque(), lines=[], offset=0)
+
+    first_seq = logs[0][0] if logs else log_seq + 1
+    entries = cache["entries"]
+    while entries and entries[0][0] < first_seq:
+        cache["offset"] += entries.popleft()[1]
+
+    wraps = cache["wraps"]
+    lines = cache["lines"]
+    for seq, text, _ in filtered_entries(cache["last_seq"]):
+        wrapped = wraps.get(seq)
+        if wrapped is None:
+            wrapped = wraps[seq] = wrap_text(small_font, text, max_width)
+        lines.extend(wrapped)
+        entries.append((seq, len(wrapped)))
+    cache["last_seq"] = log_seq
+
+    if len(wraps) > 2 * max(len(logs), 1):
+        cache["wraps"] = {seq: w for seq, w in wraps.items() if seq >= first_seq}
+    if cache["offset"] > 1024 and cache["offset"] > len(lines) // 2:
+        del lines[:cache["offset"]]
+        cache["offset"] = 0
+    return lines, cache["offset"]
+
 def draw_logs(log_area, scroll=0):
     """Draw the logs in the specified area with scrolling support."""
     global console_view_rect, console_content_h
@@ -323,27 +658,17 @@ def draw_logs(log_area, scroll=0):
 
     max_width = log_area.width - 30
     base_x = log_area.x + 10
-    y = log_area.y + 10 - scroll
     line_h = small_font.get_height() + 6
+    lines, offset = get_console_lines(max_width)
+    line_count = len(lines) - offset
 
-    total_h = 10
-    for log in filtered_logs:
-        words = log.split(' ')
-        line = ''
-        while words:
-            if small_font.size(line + words[0] + ' ')[0] < max_width:
-                line += words.pop(0) + ' '
-                if not words:
-                    surface = small_font.render(line, True, COLORS["TEXT"])
-                    screen.blit(surface, (base_x, y))
-                    y += line_h
-                    total_h += line_h
-            else:
-                surface = small_font.render(line, True, COLORS["TEXT"])
-                screen.blit(surface, (base_x, y))
-                y += line_h
-                total_h += line_h
-                line = ''
+    # Only blit the lines that intersect the visible scroll window
+    first = max(0, (scroll - 10) // line_h)
+    last = min(line_count, (scroll - 10 + log_area.height) // line_h + 1)
+    for i in range(first, last):
+        y = log_area.y + 10 - scroll + i * line_h
+        screen.blit(render_text(small_font, lines[offset + i], True, COLORS["TEXT"]), (base_x, y))
+    total_h = 10 + line_count * line_h
 
     screen.set_clip(clip)
 
@@ -367,6 +692,138 @@ def draw_logs(log_area, scroll=0):
 
     return console_content_h
 
+# Metrics panel content is rebuilt only when the bot's metrics version, the size or the theme changes
+METRIC_SERIES = (
+    ("heartbeat_ms", "Heartbeat", "ms"),
+    ("commands_per_sec", "Commands", "/s"),
+    ("loop_lag_ms", "Loop lag", "ms"),
+    ("events_per_sec", "Events", "/s"),
+)
+metrics_view = {"key": None, "surface": None, "seen": None, "buttons": []}
+
+def poll_metrics():
+    """Mark the metrics panel dirty when the running bot (or shard supervisor) recorded new samples."""
+    if shard_supervisor is not None:
+        version = ("shards", shard_supervisor.version)
+    else:
+        version = bot.metrics.version if bot is not None and hasattr(bot, "metrics") else None
+    if version != metrics_view["seen"]:
+        metrics_view["seen"] = version
+        # Samples arrive every second; they should not keep the GUI out of idle frame rate
+        mark_dirty("metrics", activity=False)
+
+def draw_sparkline(surface, rect, values, color):
+    """Draw a series scaled to its own maximum inside rect."""
+    if len(values) < 2:
+        return
+    peak = max(values) or 1
+    step = rect.width / (len(values) - 1)
+    points = [
+        (rect.x + i * step, rect.bottom - 1 - (rect.height - 2) * max(0, v) / peak)
+        for i, v in enumerate(values)
+    ]
+    pygame.draw.lines(surface, color, False, points, 2)
+
+def build_metrics_panel(width, height, snapshot):
+    """Render the metrics panel content (sparklines and per-command percentiles)."""
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    line_h = small_font.get_height() + 6
+    x, y = 12, 10
+    if snapshot is None:
+        surface.blit(render_text(small_font, "Bot is not running", True, COLORS["TEXT"]), (x, y))
+        return surface
+
+    label_w = max(text_width(small_font, label) for _, label, _ in METRIC_SERIES) + 70
+    spark_w = max(40, width - label_w - 2 * x)
+    for key, label, unit in METRIC_SERIES:
+        if y + line_h > height - 6:
+            return surface
+        values = snapshot["series"].get(key, [])
+        current = f"{values[-1]:.0f} {unit}" if values else "–"
+        surface.blit(render_text(small_font, f"{label} {current}", True, COLORS["TEXT"]), (x, y))
+        draw_sparkline(surface, pygame.Rect(x + label_w, y + 2, spark_w, line_h - 6), values, COLORS["GREEN"])
+        y += line_h
+
+    summary = f"Total {snapshot['commands_total']}, errors {snapshot['errors_total']}"
+    if y + line_h <= height - 6:
+        color = COLORS["RED"] if snapshot["errors_total"] else COLORS["TEXT"]
+        surface.blit(render_text(small_font, summary, True, color), (x, y))
+        y += line_h
+
+    busiest = sorted(snapshot["commands"].items(), key=lambda item: item[1]["count"], reverse=True)
+    for name, stats in busiest:
+        if y + line_h > height - 6:
+            break
+        if stats["p50"] is None:
+            text = f"{name}: ×{stats['count']}, {stats['errors']} err"
+        else:
+            text = f"{name}: {stats['p50']:.0f}/{stats['p95']:.0f}/{stats['p99']:.0f} ms ×{stats['count']}"
+        surface.blit(render_text(small_font, truncate_to_width(small_font, text, width - 2 * x), True, COLORS["TEXT"]), (x, y))
+        y += line_h
+    return surface
+
+def build_shard_panel(width, height, supervisor):
+    """Render per-shard status, latency and event rate with stop/start and restart buttons."""
+    surface = pygame.Surface((width, height), pygame.SRCALPHA)
+    buttons = []
+    line_h = small_font.get_height() + 8
+    x, y = 12, 10
+    totals = supervisor.totals()
+    latency = f"{totals['latency_ms']:.0f} ms" if totals["latency_ms"] is not None else "–"
+    summary = f"{supervisor.shard_count} shards, {latency}, {totals['events_per_sec']:.0f} ev/s, {totals['guilds']} guilds"
+    surface.blit(render_text(small_font, truncate_to_width(small_font, summary, width - 2 * x), True, COLORS["TEXT"]), (x, y))
+    y += line_h
+    button_w = line_h + 4
+    for shard_id in sorted(supervisor.stats):
+        if y + line_h > height - 6:
+            break
+        stats = supervisor.stats[shard_id]
+        index = supervisor.worker_for(shard_id)
+        running = supervisor.workers[index]["wanted"] != "stopped"
+        shard_latency = f"{stats['latency_ms']:.0f} ms" if stats.get("latency_ms") is not None else "–"
+        text = f"#{shard_id} {stats['status']} {shard_latency} {stats.get('events_per_sec', 0):.0f} ev/s"
+        text_w = width - 2 * x - 2 * (button_w + 6)
+        color = COLORS["RED"] if stats["status"] == "crashed" else COLORS["TEXT"]
+        surface.blit(render_text(small_font, truncate_to_width(small_font, text, text_w), True, color), (x, y))
+        for offset, (label, action) in enumerate((("■" if running else "▶", "toggle"), ("↻", "restart"))):
+            rect = pygame.Rect(width - x - (2 - offset) * (button_w + 6), y - 2, button_w, line_h - 4)
+            pygame.draw.rect(surface, COLORS["GRAY"], rect, border_radius=8)
+            pygame.draw.rect(surface, COLORS["TEXT"], rect, 1, border_radius=8)
+            icon = render_text(small_font, label, True, COLORS["TEXT"])
+            surface.blit(icon, icon.get_rect(center=rect.center))
+            buttons.append((rect, action, index))
+        y += line_h
+    return surface, buttons
+
+def draw_metrics_region(rect):
+    """Draw the metrics panel next to the console, reusing its content until new samples arrive."""
+    global shard_buttons
+    draw_panel_mica(rect)
+    version = metrics_view["seen"]
+    key = (rect.size, THEME, version, id(small_font))
+    if metrics_view["key"] != key:
+        if isinstance(version, tuple) and shard_supervisor is not None:
+            metrics_view["surface"], metrics_view["buttons"] = build_shard_panel(rect.width, rect.height, shard_supervisor)
+        else:
+            snapshot = bot.metrics.snapshot() if version is not None else None
+            metrics_view["surface"] = build_metrics_panel(rect.width, rect.height, snapshot)
+            metrics_view["buttons"] = []
+        metrics_view["key"] = key
+    shard_buttons = [(r.move(rect.topleft), action, index) for r, action, index in metrics_view["buttons"]]
+    screen.blit(metrics_view["surface"], rect.topleft)
+
+def handle_shard_button(action, index):
+    """Stop/start or restart one shard worker."""
+    if shard_supervisor is None:
+        return
+    if action == "restart":
+        shard_supervisor.restart_worker(index)
+    elif shard_supervisor.workers[index]["wanted"] == "stopped":
+        shard_supervisor.start_worker(index)
+    else:
+        shard_supervisor.stop_worker(index)
+    mark_dirty("metrics")
+
 def compute_tabs(controllers, container_rect, vgap=8, hgap=10, padding_x=10, row_height=40):
     """Compute the positions and sizes of tabs based on the available space."""
     items = []
@@ -377,7 +834,7 @@ def compute_tabs(controllers, container_rect, vgap=8, hgap=10, padding_x=10, row
 
     for name in controllers:
         label = name.replace("Controller", "")
-        text_w = small_font.size(label)[0]
+        text_w = text_width(small_font, label)
         w = max(100, text_w + 24)
         if x + w > max_x:
             x = container_rect.x + padding_x
@@ -391,8 +848,9 @@ def compute_tabs(controllers, container_rect, vgap=8, hgap=10, padding_x=10, row
 
 def draw_settings_panel(panel, active_tab, scroll=0):
     """Draw the settings panel for the active controller tab with scrolling support."""
-    global setting_elements, reset_button, settings_view_rect
+    global setting_elements, reset_button, settings_view_rect, profile_button
     setting_elements.clear()
+    profile_button = None
 
     draw_panel_mica(panel)
     pygame.draw.rect(screen, COLORS["TEXT"], panel, 2, border_radius=18)
@@ -400,7 +858,7 @@ def draw_settings_panel(panel, active_tab, scroll=0):
     settings_view_rect = panel.copy()
 
     if not active_tab:
-        text = small_font.render("Select the controller tab to see the settings", True, COLORS["TEXT"])
+        text = render_text(small_font, "Select the controller tab to see the settings", True, COLORS["TEXT"])
         screen.blit(text, (panel.x + 20, panel.y + 20))
         reset_button = None
         return 0
@@ -410,17 +868,25 @@ def draw_settings_panel(panel, active_tab, scroll=0):
 
     elements = []
     title = f"{active_tab} Settings"
-    title_surf = small_font.render(title, True, COLORS["TEXT"])
+    title_surf = render_text(small_font, title, True, COLORS["TEXT"])
     title_h = title_surf.get_height()
     y += title_h + 10
 
     current_settings = settings.get(active_tab, {})
+    schema = schemas.get(active_tab, {})
 
     for key, value in current_settings.items():
-        if isinstance(value, bool):
+        spec = schema.get(key)
+        kind = spec.type if spec else type(value)
+        if kind is bool:
             rect = pygame.Rect(10, y, 30, 30)
-            elements.append(("checkbox", rect, key, active_tab, key.replace("_", " ").capitalize()))
+            label = spec.display_label(key) if spec else key.replace("_", " ").capitalize()
+            elements.append(("checkbox", rect, key, active_tab, label))
             y += 40
+        elif kind in (int, float):
+            rect = pygame.Rect(10, y, content_w - 100, 40)
+            elements.append(("input_num", rect, key, active_tab, spec.unit if spec else None))
+            y += 50
         else:
             rect = pygame.Rect(10, y, content_w - 20, 40)
             elements.append(("input", rect, key, active_tab, None))
@@ -429,11 +895,24 @@ def draw_settings_panel(panel, active_tab, scroll=0):
     reset_rect = pygame.Rect(panel.x + panel.width - 150, panel.y + 10, 120, 40)
     pygame.draw.rect(screen, COLORS["RED"], reset_rect, border_radius=18)
     pygame.draw.rect(screen, COLORS["TEXT"], reset_rect, 1, border_radius=18)
-    reset_text = small_font.render("Reset", True, COLORS["TEXT"])
+    reset_text = render_text(small_font, "Reset", True, COLORS["TEXT"])
     screen.blit(reset_text, (reset_rect.x + 10, reset_rect.y + 10))
 
     reset_button = reset_rect
 
+    if bot is not None and hasattr(bot, "profiler"):
+        if active_tab == "ControllerBot":
+            label, active = "Export", False
+        else:
+            active = bot.profiler.is_profiling(active_tab)
+            label = "Profiling" if active else "Profile"
+        profile_rect = pygame.Rect(reset_rect.x - 150, reset_rect.y, 140, 40)
+        pygame.draw.rect(screen, COLORS["YELLOW"] if active else COLORS["GRAY"], profile_rect, border_radius=18)
+        pygame.draw.rect(screen, COLORS["TEXT"], profile_rect, 1, border_radius=18)
+        profile_text = render_text(small_font, label, True, COLORS["BG"] if active else COLORS["TEXT"])
+        screen.blit(profile_text, (profile_rect.x + 10, profile_rect.y + 10))
+        profile_button = profile_rect
+
     content_height = y + 10
 
     clip = screen.get_clip()
@@ -444,17 +923,17 @@ def draw_settings_panel(panel, active_tab, scroll=0):
         sr = r.move(panel.x + 10, panel.y + 10 - scroll)
         if kind == "checkbox":
             draw_checkbox(sr, settings[controller].get(key, False), extra or key)
-            label_w = small_font.size(extra or key)[0]
+            label_w = text_width(small_font, extra or key)
             hit_rect = pygame.Rect(sr.x, sr.y, sr.width + 10 + label_w, sr.height)
-            setting_elements.append((hit_rect, key, controller))
+            setting_elements[(controller, key)] = hit_rect
         elif kind == "input":
-            draw_text_input(sr, str(settings[controller].get(key, "")), state["active_input"] == key)
-            setting_elements.append((sr, key, controller))
+            draw_text_input(sr, setting_display_text(controller, key), is_editing(controller, key))
+            setting_elements[(controller, key)] = sr
         elif kind == "input_num":
-            draw_text_input(sr, str(settings[controller].get(key, "")), state["active_input"] == key)
-            unit = small_font.render(extra or "", True, COLORS["TEXT"])
+            draw_text_input(sr, setting_display_text(controller, key), is_editing(controller, key))
+            unit = render_text(small_font, extra or "", True, COLORS["TEXT"])
             screen.blit(unit, (sr.right + 10, sr.y + 10))
-            setting_elements.append((sr, key, controller))
+            setting_elements[(controller, key)] = sr
 
     screen.set_clip(clip)
 
@@ -498,9 +977,11 @@ def draw_settings_panel(panel, active_tab, scroll=0):
 def draw_reset_modal(text="Reset this controller's settings?"):
     """Draw a modal dialog for confirming reset of controller settings."""
     global reset_confirm_rects
-    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 140)) 
-    screen.blit(overlay, (0, 0))
+    def build_overlay():
+        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 140))
+        return overlay.convert_alpha()
+    screen.blit(get_layer(("overlay", WIDTH, HEIGHT, THEME), build_overlay), (0, 0))
 
     dlg_w, dlg_h = 380, 170
     dlg_rect = pygame.Rect((WIDTH - dlg_w)//2, (HEIGHT - dlg_h)//2, dlg_w, dlg_h)
@@ -508,7 +989,7 @@ def draw_reset_modal(text="Reset this controller's settings?"):
     pygame.draw.rect(screen, COLORS["BG"], dlg_rect, border_radius=18)
     pygame.draw.rect(screen, COLORS["TEXT"], dlg_rect, 2, border_radius=18)
 
-    title = small_font.render(text, True, COLORS["TEXT"])
+    title = render_text(small_font, text, True, COLORS["TEXT"])
     screen.blit(title, (dlg_rect.centerx - title.get_width()//2, dlg_rect.y + 18))
 
     btn_w, btn_h = 120, 44
@@ -518,8 +999,8 @@ def draw_reset_modal(text="Reset this controller's settings?"):
     pygame.draw.rect(screen, COLORS["GREEN"], yes_rect, border_radius=12)
     pygame.draw.rect(screen, COLORS["RED"],   no_rect,  border_radius=12)
 
-    yes_text = small_font.render("Yes", True, COLORS["BG"])
-    no_text  = small_font.render("No", True, COLORS["BG"])
+    yes_text = render_text(small_font, "Yes", True, COLORS["BG"])
+    no_text  = render_text(small_font, "No", True, COLORS["BG"])
     screen.blit(yes_text, (yes_rect.centerx - yes_text.get_width()//2, yes_rect.centery - yes_text.get_height()//2))
     screen.blit(no_text,  (no_rect.centerx  -  no_text.get_width()//2,  no_rect.centery -  no_text.get_height()//2))
 
@@ -533,7 +1014,11 @@ def toggle_console():
 
 def setup():
     """Initial setup for the application."""
+    settings_store.on_error = lambda e: log_message(f"Error saving settings: {str(e)}", level="error")
+    log_pipeline.subscribe(queue_console_record)
+    log_pipeline.start()
     state["token_text"] = load_token()
+    log_pipeline.set_secret("token", state["token_text"])
     update_filtered_logs()
     log_message("App started. Enter a valid Discord token and click ▶ to run the bot.")
 
@@ -544,7 +1029,11 @@ async def update_loop():
     global screen, font, small_font, icon_font
     global console_scroll, console_view_rect, console_content_h
     global settings_is_dragging, settings_drag_offset_y, settings_scroll_track_rect, settings_scroll_thumb_rect, settings_scroll_max, settings_content_h
-    global reset_confirm_active
+    global reset_confirm_active, bot_runner, shard_supervisor
+    drain_console_inbox()
+    poll_bot_status()
+    poll_shards()
+    poll_metrics()
     mouse_x, mouse_y = pygame.mouse.get_pos()
     hover_start_time = state["hover_times"]
     now = pygame.time.get_ticks()
@@ -555,7 +1044,7 @@ async def update_loop():
             if key not in hover_start_time:
                 hover_start_time[key] = now
             if now - hover_start_time[key] > 500:
-                tooltip_surface = small_font.render(text, True, (255, 255, 255))
+                tooltip_surface = render_text(small_font, text, True, (255, 255, 255))
                 tooltip_bg = pygame.Surface((tooltip_surface.get_width() + 10, tooltip_surface.get_height() + 6), pygame.SRCALPHA)
                 tooltip_bg.fill((0, 0, 0, 180))
                 tooltip_bg.blit(tooltip_surface, (5, 3))
@@ -564,10 +1053,22 @@ async def update_loop():
             hover_start_time.pop(key, None)
 
     for event in pygame.event.get():
+        mark_activity()
         if event.type == QUIT:
+            commit_edit()
+            if bot_runner:
+                bot_runner.stop()
+                bot_runner.join(timeout=5)
+            if shard_supervisor:
+                shard_supervisor.stop()
+                shard_supervisor.join(timeout=10)
+            settings_store.flush()
+            log_pipeline.close()
             pygame.quit()
             sys.exit()
         if reset_confirm_active:
+            if event.type in (MOUSEBUTTONDOWN, KEYDOWN):
+                mark_dirty()
             if event.type == MOUSEBUTTONDOWN:
                 if "yes" in reset_confirm_rects and reset_confirm_rects["yes"].collidepoint(event.pos):
                     reset_settings(state["active_tab"])
@@ -589,81 +1090,112 @@ async def update_loop():
             WIDTH, HEIGHT = max(event.w, MIN_WIDTH), max(event.h, MIN_HEIGHT)
             screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
             font, small_font, icon_font = get_fonts()
+            invalidate_layers()
+            mark_dirty()
+        elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+            mark_dirty()
         elif event.type == MOUSEWHEEL:
             if settings_view_rect and settings_view_rect.collidepoint(mouse_x, mouse_y):
+                mark_dirty("settings")
                 settings_scroll -= event.y * 30
                 if settings_scroll_max:
                     settings_scroll = max(0, min(settings_scroll, settings_scroll_max))
                 else:
                     settings_scroll = max(0, settings_scroll)
             elif console_view_rect and console_view_rect.collidepoint(mouse_x, mouse_y):
+                mark_dirty("console")
                 console_scroll -= event.y * 30
                 view_h = (console_view_rect.height - 10) if console_view_rect else 0
                 max_scroll = max(0, console_content_h - view_h)
                 console_scroll = max(0, min(console_scroll, max_scroll))
         elif event.type == MOUSEBUTTONDOWN:
+            mark_dirty()
+            commit_edit()
             if toggle_button and toggle_button.collidepoint(event.pos):
                 toggle_console()
             elif token_box and token_box.collidepoint(event.pos):
                 state["active_token"] = True
                 state["active_search"] = False
-                state["active_input"] = None
             elif search_box and search_box.collidepoint(event.pos):
                 state["active_token"] = False
                 state["active_search"] = True
-                state["active_input"] = None
             elif start_button and start_button.collidepoint(event.pos) and state["token_text"] and not bot_running:
                 log_message("Starting bot...")
                 try:
-                    bot = ControllerBot(state["token_text"], log_message)
-                    bot_task = asyncio.create_task(bot.start(state["token_text"]))
-                    bot_running = True
-                    save_token(state["token_text"])
-                    log_message(f"Bot started. Loaded controllers: {bot.controllers}")
-                    state["active_tab"] = bot.controllers[0] if bot.controllers else None
+                    log_pipeline.set_secret("token", state["token_text"])
+                    shard_count = settings.get("ControllerBot", {}).get("shard_count", 0)
+                    if shard_count > 0:
+                        from controller.sharding import ShardSupervisor
+                        shard_supervisor = ShardSupervisor(
+                            state["token_text"], shard_count,
+                            settings["ControllerBot"].get("shards_per_process", 1),
+                        )
+                        shard_supervisor.start()
+                        bot_running = True
+                        save_token(state["token_text"])
+                    elif BOT_MODE == "thread":
+                        from controller.runner import BotThread
+                        bot_runner = BotThread(state["token_text"])
+                        bot_runner.start()
+                        bot_running = True
+                        save_token(state["token_text"])
+                    else:
+                        from controller.bot import ControllerBot
+                        bot = ControllerBot(state["token_text"])
+                        bot_task = asyncio.create_task(bot.start(state["token_text"]))
+                        bot_running = True
+                        save_token(state["token_text"])
+                        log_message(f"Bot started. Loaded controllers: {bot.controllers}")
+                        state["active_tab"] = bot.controllers[0] if bot.controllers else None
+                    mark_dirty()
                 except Exception as e:
-                    log_message(f"Error starting bot: {str(e)}")
+                    log_message(f"Error starting bot: {str(e)}", level="error")
             elif pause_button and pause_button.collidepoint(event.pos) and bot_running:
                 log_message("Stopping bot...")
                 try:
-                    if bot:
+                    if shard_supervisor:
+                        # poll_shards() finishes the stop once every worker has exited
+                        shard_supervisor.stop()
+                    elif bot_runner:
+                        # Completion arrives as a "stopped" status message
+                        bot_runner.stop()
+                    elif bot:
                         await bot.close()
                         bot_task.cancel()
                         bot_running = False
                         log_message("Bot stopped.")
                         state["active_tab"] = None
+                        mark_dirty()
                 except Exception as e:
-                    log_message(f"Error stopping bot: {str(e)}")
+                    log_message(f"Error stopping bot: {str(e)}", level="error")
             else:
+                for button_rect, action, index in shard_buttons:
+                    if button_rect.collidepoint(event.pos):
+                        handle_shard_button(action, index)
+
                 for tab_rect, tab_name in tab_buttons:
                     if tab_rect.collidepoint(event.pos):
                         state["active_tab"] = tab_name if state["active_tab"] != tab_name else None
-                        state["active_input"] = None
 
-                for element_rect, setting_key, target in setting_elements:
+                for (target, setting_key), element_rect in setting_elements.items():
                     if element_rect.collidepoint(event.pos):
-                        if setting_key in ["enabled", "ban_enabled", "kick_enabled", "mute_enabled"]:
-                            settings[target][setting_key] = not settings[target][setting_key]
-                            save_settings()
-            
-                            if bot_running and bot:
-                                controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                                if controller:
-                                    controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                    controller.save_settings()
-                                elif target == "ControllerBot":
-                                    bot.settings[state["active_input"]] = settings[target][state["active_input"]]
-
-
-                            log_message(f"Updated {setting_key} to {settings[target][setting_key]}")
+                        if setting_type(target, setting_key) is bool:
+                            apply_setting(target, setting_key, not settings[target][setting_key])
                         else:
-                            state["active_input"] = setting_key
+                            begin_edit(target, setting_key)
                             state["active_token"] = False
                             state["active_search"] = False
 
                 if reset_button and reset_button.collidepoint(event.pos):
                     reset_confirm_active = True
-                    state["active_input"] = None
+                elif profile_button and profile_button.collidepoint(event.pos) and bot is not None:
+                    if state["active_tab"] == "ControllerBot":
+                        # Reading a profile stops it, so export on the bot's own thread
+                        run_on_bot(bot.export_stats)
+                    else:
+                        enabled = not bot.profiler.is_profiling(state["active_tab"])
+                        bot.profiler.set_profiling(state["active_tab"], enabled)
+                        log_message(f"Profiling {'on' if enabled else 'off'} for {state['active_tab']}")
                 if settings_scroll_thumb_rect and settings_scroll_thumb_rect.collidepoint(event.pos):
                     settings_is_dragging = True
                     settings_drag_offset_y = event.pos[1] - settings_scroll_thumb_rect.y
@@ -676,6 +1208,7 @@ async def update_loop():
 
         elif event.type == MOUSEMOTION:
             if settings_is_dragging and settings_scroll_track_rect and settings_scroll_thumb_rect:
+                mark_dirty("settings")
                 track = settings_scroll_track_rect
                 thumb = settings_scroll_thumb_rect
                 new_thumb_y = event.pos[1] - settings_drag_offset_y
@@ -690,7 +1223,15 @@ async def update_loop():
             settings_is_dragging = False
 
         elif event.type == KEYDOWN:
+            if state["active_token"]:
+                mark_dirty("header")
+            elif state["active_search"]:
+                mark_dirty("header")
+                mark_dirty("console")
+            elif state["active_input"]:
+                mark_dirty("settings")
             if (event.key == K_v and (event.mod & KMOD_CTRL or event.mod & KMOD_META)):
+                import pyperclip
                 pasted_text = pyperclip.paste()
                 if state["active_token"]:
                     state["token_text"] += sanitize_text(pasted_text)
@@ -698,33 +1239,7 @@ async def update_loop():
                     state["search_text"] += sanitize_text(pasted_text)
                     update_filtered_logs()
                 elif state["active_input"]:
-                    target = next((t for r, k, t in setting_elements if k == state["active_input"]), None)
-                    if target:
-
-                        if state["active_input"] == "default_mute_duration":
-                            try:
-                                settings[target][state["active_input"]] = int(pasted_text)
-                                save_settings()
-                                if bot_running and bot:
-                                    controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                                    if controller:
-                                        controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                        controller.save_settings()
-                                    elif target == "ControllerBot":
-                                        bot.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                        log_message(f"🔄 Prefix applied: {bot.settings[state['active_input']]}")
-
-
-                            except ValueError:
-                                log_message("Invalid number for mute duration")
-                        else:
-                            settings[target][state["active_input"]] = sanitize_text(pasted_text)
-                            save_settings()
-                            if bot_running and bot:
-                                controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                                if controller:
-                                    controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                    controller.save_settings()
+                    state["input_buffer"] += sanitize_text(pasted_text)
             elif state["active_token"]:
                 if event.key == K_BACKSPACE:
                     state["token_text"] = state["token_text"][:-1]
@@ -740,43 +1255,19 @@ async def update_loop():
                     state["search_text"] = sanitize_text(state["search_text"])
                     update_filtered_logs()
             elif state["active_input"]:
-                target = next((t for r, k, t in setting_elements if k == state["active_input"]), None)
-                if target:
-                    current_value = str(settings[target].get(state["active_input"], ""))
-                    if event.key == K_BACKSPACE:
-                        settings[target][state["active_input"]] = current_value[:-1] if current_value else ""
-                        save_settings()
-                        if bot_running and bot:
-                            controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                            if controller:
-                                controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                controller.save_settings()
-                    elif event.unicode.isprintable():
-                        if state["active_input"] == "default_mute_duration":
-                            if event.unicode.isdigit():
-                                current_value = str(settings[target].get(state["active_input"], ""))
-                                try:
-                                    settings[target][state["active_input"]] = int(current_value + event.unicode)
-                                    save_settings()
-                                    if bot_running and bot:
-                                        controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                                        if controller:
-                                            controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                            controller.save_settings()
-                                except ValueError:
-                                    log_message("Invalid input for mute duration")
-                            else:
-                                log_message("Mute duration accepts only digits")
-                        else:
-                            settings[target][state["active_input"]] = current_value + event.unicode
-                            save_settings()
-                            if bot_running and bot:
-                                controller = next((c for c in bot._controllers if type(c).__name__ == target), None)
-                                if controller:
-                                    controller.settings[state["active_input"]] = settings[target][state["active_input"]]
-                                    controller.save_settings()
+                # Typed text stays in the edit buffer; it is validated and applied once on commit
+                if event.key in (K_RETURN, K_KP_ENTER, K_TAB):
+                    commit_edit()
+                elif event.key == K_ESCAPE:
+                    cancel_edit()
+                elif event.key == K_BACKSPACE:
+                    state["input_buffer"] = state["input_buffer"][:-1]
+                elif event.unicode.isprintable():
+                    state["input_buffer"] += event.unicode
 
             if console_view_rect and console_view_rect.collidepoint(mouse_x, mouse_y):
+                if event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN, pygame.K_HOME, pygame.K_END):
+                    mark_dirty("console")
                 if event.key == pygame.K_PAGEUP:
                     console_scroll = max(0, console_scroll - (console_view_rect.height - 40))
                 elif event.key == pygame.K_PAGEDOWN:
@@ -789,13 +1280,17 @@ async def update_loop():
                     view_h = console_view_rect.height - 10
                     console_scroll = max(0, console_content_h - view_h)
 
-    draw_gradient_background()
+    if redraw["full"] or redraw["regions"] or reset_confirm_active or not EVENT_REDRAW:
+        draw_frame()
+
+def compute_layout():
+    """Compute panel and widget rectangles for the current window size and tabs."""
+    global start_button, pause_button, toggle_button, token_box, search_box, tab_buttons
     margin = max(10, int(min(WIDTH, HEIGHT) * 0.02))
     inner_w = WIDTH - 2 * margin
 
     panel_h = max(140, int(HEIGHT * 0.18))
     panel = pygame.Rect(margin, margin, inner_w, panel_h)
-    draw_panel_mica(panel)
 
     row_gap = 10
     input_h = 46
@@ -811,46 +1306,69 @@ async def update_loop():
 
     toggle_button = pygame.Rect(col_x - (btn_w + 12), panel.y + (panel_h - (btn_h * 2 + row_gap)) // 2, btn_w, btn_h * 2 + row_gap)
 
+    tabs_container = pygame.Rect(margin, panel.bottom + margin // 2, inner_w, 9999)
+    controllers = (
+    (bot.controllers if bot_running and bot and hasattr(bot, 'controllers') else list(controller_classes.keys()))
+    + ["ControllerBot"]
+    )
+    tab_buttons, tabs_bottom = compute_tabs(controllers, tabs_container)
+
+    spacing = margin // 2
+    available_h_below_tabs = HEIGHT - tabs_bottom - spacing - margin
+    console_h = 0
+    if show_console:
+        console_h = max(140, int(available_h_below_tabs * 0.28))
+    settings_h = available_h_below_tabs - console_h - (spacing if show_console else 0)
+    settings_h = max(140, settings_h)
+
+    settings_panel = pygame.Rect(margin, tabs_bottom + spacing, inner_w, settings_h)
+    log_area = pygame.Rect(margin, settings_panel.bottom + spacing, inner_w, console_h) if show_console else None
+    metrics_area = None
+    if log_area and inner_w >= 760:
+        metrics_w = max(260, int(inner_w * 0.3))
+        metrics_area = pygame.Rect(log_area.right - metrics_w, log_area.y, metrics_w, console_h)
+        log_area.width -= metrics_w + spacing
+
+    return {
+        "header": panel,
+        "tabs": pygame.Rect(margin, tabs_container.y, inner_w, tabs_bottom - tabs_container.y),
+        "settings": settings_panel,
+        "console": log_area,
+        "metrics": metrics_area,
+        "tab_names": tuple(controllers),
+    }
+
+def draw_header(panel):
+    """Draw the top panel with the token/search inputs and bot buttons."""
+    draw_panel_mica(panel)
     draw_text_input(token_box, state["token_text"], state["active_token"], mask=True)
     draw_text_input(search_box, state["search_text"], state["active_search"])
 
     pygame.draw.rect(screen, COLORS["GREEN"] if not bot_running else COLORS["GRAY"], start_button, border_radius=18)
-    play_icon = icon_font.render("▶", True, COLORS["BG"])
+    play_icon = render_text(icon_font, "▶", True, COLORS["BG"])
     screen.blit(play_icon, play_icon.get_rect(center=start_button.center))
 
     pygame.draw.rect(screen, COLORS["RED"] if bot_running else COLORS["GRAY"], pause_button, border_radius=18)
-    pause_icon = icon_font.render("⏸", True, COLORS["BG"])
+    pause_icon = render_text(icon_font, "⏸", True, COLORS["BG"])
     screen.blit(pause_icon, pause_icon.get_rect(center=pause_button.center))
 
     pygame.draw.rect(screen, COLORS["ACCENT_END"], toggle_button, border_radius=18)
     icon = "🗖" if show_console else "🗕"
-    toggle_icon = icon_font.render(icon, True, COLORS["BG"])
+    toggle_icon = render_text(icon_font, icon, True, COLORS["BG"])
     screen.blit(toggle_icon, toggle_icon.get_rect(center=toggle_button.center))
 
-    tabs_container = pygame.Rect(margin, panel.bottom + margin // 2, inner_w, 9999)
-    tab_buttons.clear()
-    controllers = (
-    (bot.controllers if bot_running and bot and hasattr(bot, 'controllers') else list(controller_classes.keys()))
-    + ["ControllerBot"]
-    )
-
-    tab_buttons, tabs_bottom = compute_tabs(controllers, tabs_container)
+def draw_tabs():
+    """Draw the controller tab strip."""
     for rect, controller in tab_buttons:
         color = COLORS["ACCENT_START"] if state["active_tab"] == controller else COLORS["GRAY"]
         pygame.draw.rect(screen, color, rect, border_radius=18)
         pygame.draw.rect(screen, COLORS["TEXT"], rect, 1, border_radius=18)
-        tab_text = small_font.render(controller.replace("Controller", ""), True, COLORS["TEXT"])
+        tab_text = render_text(small_font, controller.replace("Controller", ""), True, COLORS["TEXT"])
         screen.blit(tab_text, (rect.x + 10, rect.y + (rect.height - tab_text.get_height()) // 2))
 
-    spacing = margin // 2
-    available_h_below_tabs = HEIGHT - tabs_bottom - spacing - margin
-    console_h = 0
-    if show_console:
-        console_h = max(140, int(available_h_below_tabs * 0.28))
-    settings_h = available_h_below_tabs - console_h - (spacing if show_console else 0)
-    settings_h = max(140, settings_h)
-
-    settings_panel = pygame.Rect(margin, tabs_bottom + spacing, inner_w, settings_h)
+def draw_settings_region(settings_panel):
+    """Draw the settings panel and clamp its scroll offset."""
+    global settings_scroll
     if settings_scroll_max:
         settings_scroll = max(0, min(settings_scroll, settings_scroll_max))
     content_h = draw_settings_panel(settings_panel, state["active_tab"], scroll=settings_scroll)
@@ -858,29 +1376,115 @@ async def update_loop():
     if settings_scroll > max_scroll_settings:
         settings_scroll = max_scroll_settings
 
-    if show_console:
-        log_area = pygame.Rect(margin, settings_panel.bottom + spacing, inner_w, console_h)
-        console_content_h = draw_logs(log_area, scroll=console_scroll)
+def draw_console_region(log_area):
+    """Draw the console and clamp its scroll offset."""
+    global console_scroll, console_content_h
+    console_content_h = draw_logs(log_area, scroll=console_scroll)
 
-        view_h = log_area.height - 10
-        max_scroll_console = max(0, console_content_h - view_h)
-        if console_scroll > max_scroll_console:
-            console_scroll = max_scroll_console
+    view_h = log_area.height - 10
+    max_scroll_console = max(0, console_content_h - view_h)
+    if console_scroll > max_scroll_console:
+        console_scroll = max_scroll_console
+
+def draw_frame():
+    """Redraw the dirty regions (or the whole window) and push them to the display."""
+    global layout
+    new_layout = compute_layout()
+    full = (
+        redraw["full"] or reset_confirm_active or not EVENT_REDRAW
+        or any(new_layout[k] != layout.get(k) for k in new_layout)
+    )
+    regions = list(REGION_DRAWERS) if full else [r for r in REGION_DRAWERS if r in redraw["regions"]]
+    layout = new_layout
+    redraw["full"] = False
+    redraw["regions"].clear()
+
+    dirty_rects = []
+    if full:
+        draw_gradient_background()
+    for region in regions:
+        rect = layout.get(region)
+        if rect is None:
+            continue
+        if not full:
+            area = rect.inflate(4, 4)
+            screen.set_clip(area)
+            draw_gradient_background()
+            dirty_rects.append(area)
+        REGION_DRAWERS[region](rect)
+        if not full:
+            screen.set_clip(None)
 
     if reset_confirm_active:
         draw_reset_modal()
-    pygame.display.flip()
+    if full:
+        pygame.display.flip()
+    elif dirty_rects:
+        pygame.display.update(dirty_rects)
+
+REGION_DRAWERS = {
+    "header": draw_header,
+    "tabs": lambda rect: draw_tabs(),
+    "settings": draw_settings_region,
+    "console": draw_console_region,
+    "metrics": draw_metrics_region,
+}
+
+def report_frame_bench(frame_samples, wall_total, cpu_total):
+    """Print the per-frame render cost collected by a GUI_FRAME_BENCH run."""
+    frames = len(frame_samples)
+    wall_ms = sorted(w * 1000 for w, _ in frame_samples)
+    cpu_ms = sum(c for _, c in frame_samples) * 1000 / max(1, frames)
+    print(
+        f"Frame bench (layer cache {'on' if LAYER_CACHE_ENABLED else 'off'}, {WIDTH}x{HEIGHT}): "
+        f"{frames} frames, avg {sum(wall_ms) / max(1, frames):.2f} ms, "
+        f"p95 {wall_ms[int(frames * 0.95) - 1] if frames else 0:.2f} ms, "
+        f"CPU {cpu_ms:.2f} ms/frame, idle CPU {100 * cpu_total / max(1e-9, wall_total):.1f}% of one core"
+    )
 
 async def main():
     """Main entry point for the application."""
     global WIDTH, HEIGHT, screen, font, small_font, icon_font
+    init_display()
+    mark_phase("display + fallback fonts")
     setup()
+    mark_phase("setup")
+    # GUI_FRAME_BENCH=N renders N frames, prints their cost and exits.
+    # Compare with GUI_LAYER_CACHE=0 / GUI_EVENT_REDRAW=0 to see the baseline.
+    bench_frames = int(os.getenv("GUI_FRAME_BENCH", "0") or 0)
+    frame_samples = []
+    bench_wall_start, bench_cpu_start = time.perf_counter(), time.process_time()
     while True:
         WIDTH, HEIGHT = pygame.display.get_surface().get_size()
         WIDTH = max(WIDTH, MIN_WIDTH)
         HEIGHT = max(HEIGHT, MIN_HEIGHT)
+        frame_wall, frame_cpu = time.perf_counter(), time.process_time()
         await update_loop()
-        await asyncio.sleep(1.0 / FPS)
+        if not state.get("startup_reported"):
+            state["startup_reported"] = True
+            mark_phase("first frame")
+            log_message(startup_report("GUI", APP_START))
+            first_frame_ms = (time.perf_counter() - APP_START) * 1000
+            if first_frame_ms > FIRST_FRAME_BUDGET_MS:
+                log_message(f"First frame took {first_frame_ms:.0f} ms (budget {FIRST_FRAME_BUDGET_MS} ms)", level="warning")
+            asyncio.create_task(deferred_startup())
+        if RENDER_LOAD_MS:
+            # Synthetic render load: hold the GUI thread like a slow frame would
+            load_end = time.perf_counter() + RENDER_LOAD_MS / 1000
+            while time.perf_counter() < load_end:
+                pass
+        if bench_frames:
+            frame_samples.append((time.perf_counter() - frame_wall, time.process_time() - frame_cpu))
+            if len(frame_samples) >= bench_frames:
+                report_frame_bench(
+                    frame_samples,
+                    time.perf_counter() - bench_wall_start,
+                    time.process_time() - bench_cpu_start,
+                )
+                settings_store.flush()
+                pygame.quit()
+                return
+        await asyncio.sleep(frame_delay())
 
 if platform.system() == "Emscripten":
     asyncio.ensure_future(main())